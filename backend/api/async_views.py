@@ -0,0 +1,71 @@
+"""
+Асинхронные версии частых эндпоинтов для запуска под ASGI (uvicorn).
+
+Синхронные view Django под ASGI выполняет по очереди в одном общем
+потоке. Здесь DRF-view целиком (ORM, сериализация, рендеринг) выполняется
+в пуле потоков через sync_to_async, одновременно - не больше
+ASYNC_ORM_CONCURRENCY вызовов. Отправка ответа медленному клиенту остается
+асинхронной и не занимает поток.
+"""
+import asyncio
+from functools import lru_cache, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+@lru_cache(maxsize=None)
+def get_orm_semaphore():
+    # семафор создается в цикле событий воркера при первом запросе
+    return asyncio.Semaphore(settings.ASYNC_ORM_CONCURRENCY)
+
+
+def run_view(view, request, *args, **kwargs):
+    """
+    Выполняет view и возвращает готовый HttpResponse: потоковый ответ
+    читается здесь же, потому что его генераторы обращаются к БД, а это
+    нельзя делать в цикле событий.
+    """
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        content = (
+            b''.join(response.streaming_content) if response.streaming
+            else response.content
+        )
+        result = HttpResponse(
+            content, status=response.status_code, headers=response.headers
+        )
+        result.cookies = response.cookies
+        return result
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        async with get_orm_semaphore():
+            return await sync_to_async(run_view, thread_sensitive=False)(
+                view, request, *args, **kwargs
+            )
+    return wrapper
+
+
+tag_list = async_view(TagViewSet.as_view({'get': 'list'}))
+ingredient_list = async_view(IngredientViewSet.as_view({'get': 'list'}))
+recipe_detail = async_view(RecipeViewSet.as_view({
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}))
+download_shopping_cart = async_view(RecipeViewSet.as_view(
+    {'get': 'download_shopping_cart'},
+    **RecipeViewSet.download_shopping_cart.kwargs
+))
@@ -0,0 +1,48 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from recipes import versions
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def response_key(request, names):
+    """
+    Ключ кэша ответа: пользователь, адрес сайта (в ответе абсолютные
+    ссылки), параметры запроса без учета порядка и текущие версии names.
+    """
+    params = sorted(
+        (key, sorted(values))
+        for key, values in request.query_params.lists()
+    )
+    etag, _ = versions.validators(*names)
+    digest = hashlib.sha1(
+        f'{request.user.pk}|{request.build_absolute_uri("/")}|'
+        f'{params}|{etag}'.encode()
+    ).hexdigest()
+    return f'response:{request.path}:{digest}'
+
+
+def cached_response(get_names):
+    """
+    Декоратор метода ViewSet: данные успешного ответа хранятся в кэше
+    Django, пока не изменится одна из версий get_names(request, **kwargs),
+    но не дольше RESPONSE_CACHE_TIMEOUT секунд.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            key = response_key(request, get_names(request, **kwargs))
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(
+                    key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+                )
+            return response
+        return wrapper
+    return decorator
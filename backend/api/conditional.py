@@ -0,0 +1,37 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from recipes import versions
+
+
+def versioned(get_names, vary_on_user=False):
+    """
+    Декоратор метода ViewSet для условных GET-запросов.
+    get_names(request, **kwargs) возвращает имена версий (recipes.versions),
+    от которых зависит ответ. ETag и Last-Modified считаются по версиям из
+    кэша, поэтому ответ 304 отдается без обращения к ORM.
+    vary_on_user - ответ зависит от пользователя (добавляется Vary).
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, '_version_validators'):
+            request._version_validators = versions.validators(
+                *get_names(request, **kwargs)
+            )
+        return request._version_validators
+
+    def etag(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return get_validators(request, *args, **kwargs)[1]
+
+    def decorator(method):
+        method = method_decorator(
+            condition(etag_func=etag, last_modified_func=last_modified)
+        )(method)
+        if vary_on_user:
+            method = method_decorator(
+                vary_on_headers('Authorization')
+            )(method)
+        return method
+    return decorator
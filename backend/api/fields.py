@@ -0,0 +1,25 @@
+from recipes.images import rendition_urls
+from recipes.models import ImageStatus
+from rest_framework import serializers
+
+
+class ImageRenditionsField(serializers.Field):
+    """
+    Ссылки на уменьшенные копии картинки рецепта: {rendition: {format: url}}.
+    Пока копии не готовы (image_status != ready) - None.
+    """
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image or recipe.image_status != ImageStatus.READY:
+            return None
+        urls = rendition_urls(recipe.image)
+        request = self.context.get('request')
+        if request is not None:
+            for formats in urls.values():
+                for extension, url in formats.items():
+                    formats[extension] = request.build_absolute_uri(url)
+        return urls
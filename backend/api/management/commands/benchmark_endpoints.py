@@ -0,0 +1,346 @@
+import json
+import statistics
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from recipes.models import Recipe
+from rest_framework.test import APIClient
+
+from .benchmark_http import percentile
+
+User = get_user_model()
+
+# user: None - аноним, 'user' - пользователь с избранным, корзиной и
+# подписками, 'author' - автор рецепта
+Endpoint = namedtuple('Endpoint', 'name method path user data')
+
+DEFAULT_BASELINE = settings.BASE_DIR / 'benchmarks' / 'baseline.json'
+# разница p95 меньше этого порога считается шумом
+NOISE_MS = 5.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки (p50/p95/p99) и количество SQL-запросов для '
+        'всех публичных эндпоинтов на текущей базе (SQLite или '
+        'PostgreSQL) и сравнивает их с сохраненным baseline. Запросы '
+        'выполняются в процессе, изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество замеров каждого эндпоинта'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Количество запросов перед замерами'
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кэш перед каждым запросом'
+        )
+        parser.add_argument(
+            '--only', nargs='+', default=(),
+            help='Замерять только эндпоинты с этими подстроками в имени'
+        )
+        parser.add_argument(
+            '--baseline', default=str(DEFAULT_BASELINE),
+            help='Файл baseline (JSON)'
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить результаты как baseline вместо сравнения'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=25,
+            help='Допустимый рост p95 относительно baseline, %%'
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [
+            endpoint for endpoint in self.endpoints()
+            if not options['only']
+            or any(part in endpoint.name for part in options['only'])
+        ]
+        results = {}
+        # профили медленных запросов (monitoring) во время замеров
+        # не сохраняются
+        with override_settings(
+            PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=float('inf')
+        ):
+            for endpoint in endpoints:
+                results[endpoint.name] = self.measure(endpoint, options)
+
+        baseline = self.load_baseline(options)
+        self.report(results, baseline)
+        if options['save_baseline']:
+            self.save_baseline(options, results)
+        elif baseline is not None:
+            self.check_regressions(results, baseline, options['tolerance'])
+
+    def endpoints(self):
+        user = User.objects.filter(
+            is_in_shopping_cart__isnull=False, follower__isnull=False
+        ).order_by('id').first()
+        recipe = Recipe.objects.filter(
+            amounts__isnull=False, tags__isnull=False
+        ).order_by('-favorites_count', 'id').first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'Нет данных для замеров: заполните базу '
+                '(manage.py seed_synthetic)'
+            )
+        # изменяется и удаляется рецепт без избранного и корзин, иначе
+        # замер зависит от популярности рецепта
+        own = Recipe.objects.filter(
+            amounts__isnull=False
+        ).order_by('favorites_count', 'carts_count', 'id').first()
+        self.users = {'user': user, 'author': own.author}
+        # рецепт и автор, с которыми у пользователя еще нет связей
+        other = Recipe.objects.exclude(
+            is_favorited__user=user
+        ).exclude(is_in_shopping_cart__user=user).order_by('id').first()
+        author = User.objects.exclude(
+            following__user=user
+        ).exclude(id=user.id).order_by('-followers_count', 'id').first()
+        if other is None or author is None:
+            raise CommandError(
+                f'У пользователя {user.username} уже есть в избранном или '
+                'корзине все рецепты либо подписки на всех авторов: '
+                'добавьте данных (manage.py seed_synthetic)'
+            )
+        amounts = list(recipe.amounts.select_related('ingredient'))
+        tags = list(recipe.tags.all())
+        tags_query = '&'.join(f'tags={tag.slug}' for tag in tags)
+        recipe_data = {
+            'name': 'benchmark',
+            'text': 'benchmark',
+            'cooking_time': 10,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [
+                {'id': amount.ingredient_id, 'amount': amount.amount}
+                for amount in amounts
+            ],
+        }
+        user_data = {
+            'username': 'benchmark',
+            'email': 'benchmark@example.com',
+            'first_name': 'benchmark',
+            'last_name': 'benchmark',
+            'password': 'benchmark-password',
+        }
+        recipes = reverse('api:recipes-list')
+        cart = reverse('api:recipes-download-shopping-cart')
+        return [
+            Endpoint('tags-list', 'get', reverse('api:tags-list'), None,
+                     None),
+            Endpoint('tags-detail', 'get',
+                     reverse('api:tags-detail', args=[tags[0].id]),
+                     None, None),
+            Endpoint('ingredients-list', 'get',
+                     reverse('api:ingredients-list')
+                     + '?name=' + quote(amounts[0].ingredient.name[:2]),
+                     None, None),
+            Endpoint('ingredients-detail', 'get',
+                     reverse('api:ingredients-detail',
+                             args=[amounts[0].ingredient_id]),
+                     None, None),
+            Endpoint('recipes-list', 'get', recipes, None, None),
+            Endpoint('recipes-list-auth', 'get', recipes, 'user', None),
+            Endpoint('recipes-list-tags', 'get', f'{recipes}?{tags_query}',
+                     None, None),
+            Endpoint('recipes-list-tags-all', 'get',
+                     f'{recipes}?{tags_query}&tags_mode=all', None, None),
+            Endpoint('recipes-list-author', 'get',
+                     f'{recipes}?author={recipe.author_id}', None, None),
+            Endpoint('recipes-list-favorited', 'get',
+                     f'{recipes}?is_favorited=1', 'user', None),
+            Endpoint('recipes-list-cart', 'get',
+                     f'{recipes}?is_in_shopping_cart=1', 'user', None),
+            Endpoint('recipes-list-cursor', 'get', f'{recipes}?cursor=',
+                     None, None),
+            Endpoint('recipes-list-search', 'get',
+                     f'{recipes}?search=' + quote(recipe.name.split()[0]),
+                     None, None),
+            Endpoint('recipes-detail', 'get',
+                     reverse('api:recipes-detail', args=[recipe.id]),
+                     'user', None),
+            Endpoint('recipes-create', 'post', recipes, 'user',
+                     recipe_data),
+            Endpoint('recipes-update', 'patch',
+                     reverse('api:recipes-detail', args=[own.id]),
+                     'author', recipe_data),
+            Endpoint('recipes-delete', 'delete',
+                     reverse('api:recipes-detail', args=[own.id]),
+                     'author', None),
+            Endpoint('recipes-favorite', 'post',
+                     reverse('api:recipes-favorite', args=[other.id]),
+                     'user', None),
+            Endpoint('recipes-shopping-cart', 'post',
+                     reverse('api:recipes-shopping-cart', args=[other.id]),
+                     'user', None),
+            Endpoint('recipes-download-shopping-cart-pdf', 'get', cart,
+                     'user', None),
+            Endpoint('recipes-download-shopping-cart-txt', 'get',
+                     f'{cart}?format=txt', 'user', None),
+            Endpoint('users-list', 'get', reverse('api:users:users-list'),
+                     'user', None),
+            Endpoint('users-detail', 'get',
+                     reverse('api:users:users-detail',
+                             args=[recipe.author_id]),
+                     'user', None),
+            Endpoint('users-me', 'get',
+                     reverse('api:users:users-me'),
+                     'user', None),
+            Endpoint('users-subscriptions', 'get',
+                     reverse('api:users:users-subscriptions'),
+                     'user', None),
+            Endpoint('users-subscribe', 'post',
+                     reverse('api:users:users-subscribe', args=[author.id]),
+                     'user', None),
+            Endpoint('users-create', 'post',
+                     reverse('api:users:users-list'), None, user_data),
+        ]
+
+    def measure(self, endpoint, options):
+        client = APIClient(SERVER_NAME='localhost')
+        if endpoint.user is not None:
+            client.force_authenticate(self.users[endpoint.user])
+        latencies, queries, statuses = [], [], set()
+        for i in range(options['warmup'] + options['repeat']):
+            if not options['warm']:
+                cache.clear()
+            # каждый запрос в откатываемой транзакции: записи не
+            # накапливаются и не мешают следующим замерам
+            with transaction.atomic(), ExitStack() as stack:
+                for alias in connections:
+                    # журнал ограничен 9000 запросами, при переполнении
+                    # CaptureQueriesContext перестает их считать
+                    connections[alias].queries_log.clear()
+                captured = [
+                    stack.enter_context(
+                        CaptureQueriesContext(connections[alias])
+                    )
+                    for alias in connections
+                ]
+                start = time.perf_counter()
+                response = getattr(client, endpoint.method)(
+                    endpoint.path, endpoint.data, format='json'
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - start) * 1000
+                transaction.set_rollback(True)
+            if i < options['warmup']:
+                continue
+            latencies.append(elapsed)
+            queries.append(sum(len(context) for context in captured))
+            statuses.add(response.status_code)
+        return {
+            'p50': statistics.median(latencies),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'queries': max(queries),
+            'status': max(statuses),
+        }
+
+    def load_baseline(self, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            if not options['save_baseline']:
+                self.stdout.write(
+                    f'Baseline {options["baseline"]} не найден, '
+                    'сохраните его с --save-baseline'
+                )
+            return None
+        meta = self.meta(options)
+        if baseline['meta'] != meta:
+            self.stdout.write(self.style.WARNING(
+                f'Baseline снят в других условиях: {baseline["meta"]}, '
+                f'сейчас: {meta}'
+            ))
+        return baseline['results']
+
+    def meta(self, options):
+        return {
+            'vendor': connection.vendor,
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'warm': options['warm'],
+        }
+
+    def save_baseline(self, options, results):
+        path = Path(options['baseline'])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(
+                {'meta': self.meta(options), 'results': results},
+                file, indent=2, sort_keys=True
+            )
+        self.stdout.write(self.style.SUCCESS(f'Baseline сохранен в {path}'))
+
+    def report(self, results, baseline):
+        header = (
+            f'{"endpoint":<36} {"status":>6} {"p50, ms":>8} '
+            f'{"p95, ms":>8} {"p99, ms":>8} {"queries":>7}'
+        )
+        if baseline is not None:
+            header += f' {"Δp50":>7} {"Δp95":>7} {"Δqueries":>8}'
+        self.stdout.write(header)
+        for name, result in results.items():
+            line = (
+                f'{name:<36} {result["status"]:>6} {result["p50"]:>8.1f} '
+                f'{result["p95"]:>8.1f} {result["p99"]:>8.1f} '
+                f'{result["queries"]:>7}'
+            )
+            base = (baseline or {}).get(name)
+            if base is not None:
+                line += (
+                    f' {change(result["p50"], base["p50"]):>7} '
+                    f'{change(result["p95"], base["p95"]):>7} '
+                    f'{result["queries"] - base["queries"]:>+8}'
+                )
+            self.stdout.write(line)
+
+    def check_regressions(self, results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: запросов {base["queries"]} -> '
+                    f'{result["queries"]}'
+                )
+            growth = result['p95'] - base['p95']
+            if growth > max(base['p95'] * tolerance / 100, NOISE_MS):
+                regressions.append(
+                    f'{name}: p95 {base["p95"]:.1f} -> '
+                    f'{result["p95"]:.1f} мс'
+                )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно baseline:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+
+def change(value, base):
+    """Изменение value относительно base в процентах"""
+    if not base:
+        return '-'
+    return f'{(value - base) / base * 100:+.0f}%'
@@ -0,0 +1,88 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер (WSGI или ASGI) запросами к частым '
+        'GET-эндпоинтам и выводит запросы/с и задержки p50/p99.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Адрес запущенного сервера'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=100,
+            help='Количество одновременных соединений'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Количество запросов к каждому эндпоинту'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для скачивания списка покупок'
+        )
+
+    def handle(self, *args, **options):
+        recipe = Recipe.objects.order_by('id').first()
+        paths = ['/api/tags/', '/api/ingredients/?name=' + quote('са')]
+        if recipe is not None:
+            paths.append(f'/api/recipes/{recipe.id}/')
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+            paths.append('/api/recipes/download_shopping_cart/')
+
+        self.stdout.write(
+            f'{"endpoint":<42} {"req/s":>8} {"p50, ms":>8} '
+            f'{"p99, ms":>8} {"errors":>7}'
+        )
+        for path in paths:
+            rps, latencies, errors = self.load(
+                options['url'] + path, headers,
+                options['requests'], options['concurrency']
+            )
+            self.stdout.write(
+                f'{path:<42} {rps:>8.1f} '
+                f'{statistics.median(latencies):>8.1f} '
+                f'{percentile(latencies, 99):>8.1f} {errors:>7}'
+            )
+
+    def load(self, url, headers, total, concurrency):
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def fetch(_):
+            request = urllib.request.Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                failed = False
+            except (urllib.error.URLError, OSError):
+                failed = True
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                (errors if failed else latencies).append(elapsed)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(fetch, range(total)))
+        rps = total / (time.perf_counter() - start)
+        return rps, latencies or [0], len(errors)
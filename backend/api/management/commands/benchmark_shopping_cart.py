@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время скачивания списка покупок без кэша (cold) '
+        'и из кэша (warm). Тестовые данные откатываются после замера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines', type=int, nargs='+', default=[10, 100, 1000],
+            help='Количество строк в списке покупок'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Количество замеров для каждого размера'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"lines":>6} {"cold, ms":>10} {"warm, ms":>10} {"speedup":>8}'
+        )
+        for lines in options['lines']:
+            cold, warm = self.measure(lines, options['repeat'])
+            self.stdout.write(
+                f'{lines:>6} {cold:>10.1f} {warm:>10.1f} '
+                f'{cold / warm:>7.1f}x'
+            )
+
+    def measure(self, lines, repeat):
+        with transaction.atomic():
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(self.make_cart(lines))
+            url = reverse('api:recipes-download-shopping-cart')
+            cold, warm = [], []
+            for _ in range(repeat):
+                cache.clear()
+                cold.append(self.timed_get(client, url))
+                warm.append(self.timed_get(client, url))
+            transaction.set_rollback(True)
+        return statistics.median(cold), statistics.median(warm)
+
+    def timed_get(self, client, url):
+        start = time.perf_counter()
+        response = client.get(url)
+        b''.join(response.streaming_content)
+        return (time.perf_counter() - start) * 1000
+
+    def make_cart(self, lines):
+        user = User.objects.create(
+            username='benchmark', email='benchmark@example.com'
+        )
+        recipe = Recipe.objects.create(
+            author=user, name='benchmark', text='benchmark', cooking_time=1
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'benchmark {i}', measurement_unit='г')
+            for i in range(lines)
+        )
+        if not all(ingredient.pk for ingredient in ingredients):
+            ingredients = Ingredient.objects.filter(
+                name__startswith='benchmark '
+            )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        )
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+        return user
@@ -0,0 +1,45 @@
+import io
+import os
+
+from django.conf import settings
+from reportlab.pdfbase import pdfmetrics, ttfonts
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'TNR'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'api/fonts/Times.ttf')
+NUMBER_OF_BULLETS_ON_PAGE = 20
+
+
+def register_fonts():
+    """Регистрирует шрифт для pdf (один раз на процесс)"""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            ttfonts.TTFont(FONT_NAME, FONT_PATH, 'UTF-8')
+        )
+
+
+def render_shopping_list(items):
+    """
+    Формирует pdf со списком покупок.
+    items - последовательность (name, measurement_unit, amount).
+    """
+    register_fonts()
+    buffer = io.BytesIO()
+
+    pdf_report = canvas.Canvas(buffer)
+    pdf_report.setFont(FONT_NAME, size=24)
+    pdf_report.drawString(100, 750, "Список покупок")
+    pdf_report.setFont(FONT_NAME, size=18)
+    for i, (name, measurement_unit, amount) in enumerate(items):
+        line = f'\u2022 {name}, {measurement_unit}: {amount}'
+        pos = 720-(i % NUMBER_OF_BULLETS_ON_PAGE)*20
+        pdf_report.drawString(100, pos, line)
+        if i % NUMBER_OF_BULLETS_ON_PAGE == NUMBER_OF_BULLETS_ON_PAGE-1:
+            pdf_report.showPage()
+            pdf_report.setFont(FONT_NAME, size=24)
+            pdf_report.drawString(100, 750, "Список покупок (продолжение)")
+            pdf_report.setFont(FONT_NAME, size=18)
+
+    pdf_report.showPage()
+    pdf_report.save()
+    return buffer.getvalue()
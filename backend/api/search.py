@@ -0,0 +1,64 @@
+import bisect
+import threading
+
+from recipes import versions
+from recipes.models import Ingredient
+
+
+class IngredientSearchIndex:
+    """
+    Отсортированный индекс названий ингредиентов в памяти процесса.
+    Регистр сравнивается через str.casefold(), поэтому кириллица
+    обрабатывается корректно на любой БД. Поиск по началу названия -
+    бисекцией, по подстроке - перебором. Индекс перестраивается, когда
+    меняется версия ингредиентов (recipes.versions.INGREDIENTS).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._keys = None
+        self._items = None
+
+    def _load(self):
+        version = versions.get_versions(versions.INGREDIENTS)
+        with self._lock:
+            if self._version != version:
+                items = sorted(
+                    (name.casefold(), pk, name, measurement_unit)
+                    for pk, name, measurement_unit
+                    in Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'
+                    )
+                )
+                self._keys = [item[0] for item in items]
+                self._items = items
+                self._version = version
+            return self._keys, self._items
+
+    def search(self, name, limit):
+        keys, items = self._load()
+        name = name.casefold()
+        prefix_start = bisect.bisect_left(keys, name)
+        prefix_end = prefix_start
+        found = []
+        while (
+            prefix_end < len(keys)
+            and keys[prefix_end].startswith(name)
+            and len(found) < limit
+        ):
+            found.append(items[prefix_end])
+            prefix_end += 1
+        if len(found) < limit:
+            for pos, key in enumerate(keys):
+                if prefix_start <= pos < prefix_end or name not in key:
+                    continue
+                found.append(items[pos])
+                if len(found) == limit:
+                    break
+        return [
+            Ingredient(id=pk, name=name, measurement_unit=measurement_unit)
+            for _, pk, name, measurement_unit in found
+        ]
+
+
+ingredient_index = IngredientSearchIndex()
@@ -1,24 +1,173 @@
 import base64
-
-from django.core.files.base import ContentFile
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+import binascii
+import re
+from collections import Counter
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from recipes import versions
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            ShoppingListItem, Tag)
+from recipes.signals import mute_amounts_signals
 from rest_framework import serializers
-from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.relations import MANY_RELATION_KWARGS
 from users.serializers import UserSerializer
 
+from .fields import ImageRenditionsField
+
 
 class Base64ImageField(serializers.ImageField):
-    """Сериализатор для поля с картинками"""
+    """
+    Сериализатор для поля с картинками.
+    Картинку в data URI декодирует по частям во временный файл и
+    прекращает декодирование, как только превышен размер.
+    """
+    CHUNK_SIZE = 64 * 1024
+    # пробелы и переносы строк (перенос по 76 символов в MIME) пропускаются
+    NOT_BASE64 = re.compile(r'[^A-Za-z0-9+/=]')
+    # тип из data URI -> расширение файла
+    EXTENSIONS = {
+        'png': 'png', 'jpeg': 'jpg', 'jpg': 'jpg', 'gif': 'gif',
+        'webp': 'webp',
+    }
+    default_error_messages = {
+        'max_size': 'Размер картинки больше {max_size} байт.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(
-                base64.b64decode(imgstr),
-                name='rcp_img.' + ext
+            data = self.decode(data)
+        if getattr(data, 'size', 0) > settings.RECIPE_IMAGE_MAX_SIZE:
+            self.fail('max_size', max_size=settings.RECIPE_IMAGE_MAX_SIZE)
+
+        return super().to_internal_value(data)
+
+    def decode(self, data):
+        start = data.find(';base64,')
+        if start == -1:
+            self.fail('invalid_image')
+        ext = self.EXTENSIONS.get(data[len('data:image/'):start].lower())
+        if ext is None:
+            self.fail('invalid_image')
+
+        image = TemporaryUploadedFile(
+            'rcp_img.' + ext, f'image/{ext}', 0, None
+        )
+        try:
+            self.write_decoded(image, data, start + len(';base64,'))
+        except binascii.Error:
+            image.close()
+            self.fail('invalid_image')
+        except serializers.ValidationError:
+            image.close()
+            raise
+        image.seek(0)
+        return image
+
+    def write_decoded(self, image, data, start):
+        """
+        Пишет в image декодированные data[start:] частями. В часть идут
+        только целые группы по 4 символа, остаток переносится в следующую.
+        """
+        rest = ''
+        for pos in range(start, len(data), self.CHUNK_SIZE):
+            chunk = rest + self.NOT_BASE64.sub(
+                '', data[pos:pos + self.CHUNK_SIZE]
             )
+            whole = len(chunk) - len(chunk) % 4
+            rest = chunk[whole:]
+            image.size += image.write(base64.b64decode(chunk[:whole]))
+            if image.size > settings.RECIPE_IMAGE_MAX_SIZE:
+                self.fail(
+                    'max_size', max_size=settings.RECIPE_IMAGE_MAX_SIZE
+                )
+        if rest or not image.size:
+            raise binascii.Error('Некорректные данные base64')
+
+
+class BatchPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    pk-поле, которое умеет загрузить объекты для списка pk одним запросом
+    (pk__in). Обо всех отсутствующих и повторяющихся id сообщает сразу.
+    """
+    default_error_messages = {
+        'does_not_exist_many': 'Объекты с id {pk_values} не существуют.',
+        'duplicates': 'id {pk_values} повторяются.',
+    }
+
+    def __init__(self, **kwargs):
+        self.prefetched = None
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def prefetch(self, data):
+        """Загружает объекты для всех pk из data и возвращает их по порядку"""
+        pks = [self.to_pk(item) for item in data]
+        self.prefetched = self.get_queryset().in_bulk(pks)
+        errors = []
+        missing = sorted(set(pks) - self.prefetched.keys())
+        if missing:
+            errors.append(self.error_messages['does_not_exist_many'].format(
+                pk_values=', '.join(map(str, missing))
+            ))
+        duplicates = sorted(
+            pk for pk, count in Counter(pks).items() if count > 1
+        )
+        if duplicates:
+            errors.append(self.error_messages['duplicates'].format(
+                pk_values=', '.join(map(str, duplicates))
+            ))
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [self.prefetched[pk] for pk in pks]
+
+    def to_internal_value(self, data):
+        if self.prefetched is None:
+            return super().to_internal_value(data)
+        return self.prefetched[self.to_pk(data)]
+
+
+class BatchManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.prefetch(data)
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer, который загружает объекты поля batch_field
+    всех элементов одним запросом до валидации самих элементов.
+    """
+    batch_field = 'id'
 
+    def to_internal_value(self, data):
+        if isinstance(data, list) and all(
+            isinstance(item, Mapping) and self.batch_field in item
+            for item in data
+        ):
+            self.child.fields[self.batch_field].prefetch(
+                [item[self.batch_field] for item in data]
+            )
         return super().to_internal_value(data)
 
 
@@ -37,11 +186,12 @@ class ShowIngredientSerializer(serializers.ModelSerializer):
 
 class AddIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиентов"""
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BatchPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = BatchListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -59,49 +209,39 @@ class TagSerializer(serializers.ModelSerializer):
 
 
 class RecipeShortListSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id', 'name', 'image', 'image_status', 'image_renditions',
+            'cooking_time'
+        )
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Сериализатор рецептов (retrieve/delete)"""
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    ingredients = serializers.SerializerMethodField(read_only=True)
-    is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
-    is_favorited = serializers.SerializerMethodField(read_only=True)
+    image_renditions = ImageRenditionsField()
+    ingredients = ShowIngredientSerializer(
+        source='amounts', many=True, read_only=True
+    )
+    is_in_shopping_cart = serializers.BooleanField(
+        source='in_shopping_cart', read_only=True
+    )
+    is_favorited = serializers.BooleanField(source='favorited', read_only=True)
 
     class Meta:
         model = Recipe
         exclude = ('pub_date',)
 
-    def get_ingredients(self, obj):
-        return ShowIngredientSerializer(
-            RecipeIngredient.objects.filter(recipe=obj),
-            many=True).data
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        return (
-            not user.is_anonymous
-            and ShoppingCart.objects.filter(user=user, recipe=obj).exists()
-        )
-
-    def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        return (
-            not user.is_anonymous
-            and Favorite.objects.filter(user=user, recipe=obj).exists()
-        )
-
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор добаления рецептов (create, update)"""
     author = UserSerializer(read_only=True)
     image = Base64ImageField(required=False, allow_null=True)
-    tags = PrimaryKeyRelatedField(
+    tags = BatchPrimaryKeyRelatedField(
         many=True,
         required=False,
         queryset=Tag.objects.all()
@@ -112,48 +252,95 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         model = Recipe
         exclude = ('pub_date',)
 
-    def validate(self, attrs):
-        counter = {}
-        for item in attrs['ingredients']:
-            cnt = counter.get(item['id'], 0)
-            counter[item['id']] = cnt + 1
-        for key, value in counter.items():
-            if value != 1:
-                raise serializers.ValidationError('Ингредиенты повторяются')
-
-        return attrs
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                # временный файл Base64ImageField
+                image.close()
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredient=ingredient['id'],
                 amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
+
+    def update_ingredients(self, ingredients, recipe):
+        """Записывает только добавленные, удаленные и измененные строки"""
+        amounts = {
+            ingredient['id'].pk: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {item.ingredient_id: item for item in recipe.amounts.all()}
+        removed = current.keys() - amounts.keys()
+        added = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ]
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id, item.amount)
+            if amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        touched = removed | {item.ingredient_id for item in added + changed}
+        if not touched:
+            return
+
+        with mute_amounts_signals():
+            if removed:
+                RecipeIngredient.objects.filter(
+                    recipe=recipe, ingredient_id__in=removed
+                ).delete()
+            RecipeIngredient.objects.bulk_create(added)
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        user_ids = list(
+            recipe.is_in_shopping_cart.values_list('user_id', flat=True)
+        )
+        if user_ids:
+            ShoppingListItem.objects.refresh(user_ids, touched)
+        versions.bump_recipes(recipe.pk)
 
     def create_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags
+        )
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.select_related('author').prefetch_related(
+            'tags'
+        ).with_amounts().with_user_flags(request.user).get(pk=instance.pk)
         return RecipeSerializer(instance, context=context).data
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         ingredients = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
+        tags = validated_data.pop('tags', [])
         recipe = Recipe.objects.create(author=author, **validated_data)
         self.create_ingredients(ingredients, recipe)
         self.create_tags(tags, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        recipe.tags.clear()
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        self.create_ingredients(validated_data.pop('ingredients'), recipe)
-        self.create_tags(validated_data.pop('tags'), recipe)
+        ingredients = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, recipe)
+        if tags is not None:
+            recipe.tags.set(tags)
         return super().update(recipe, validated_data)
 
 
@@ -0,0 +1,64 @@
+import csv
+import json
+
+from recipes.models import ShoppingListItem
+
+STREAM_CHUNK_SIZE = 2000
+
+
+def get_shopping_list(user):
+    """
+    Список покупок пользователя: (name, measurement_unit, amount),
+    читается из материализованной таблицы ShoppingListItem.
+    """
+    return ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def iter_txt(rows):
+    yield 'Список покупок\n'
+    for name, measurement_unit, amount in rows:
+        yield f'\u2022 {name}, {measurement_unit}: {amount}\n'
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_json(rows):
+    separator = '['
+    for name, measurement_unit, amount in rows:
+        yield separator + json.dumps(
+            {
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+STREAMING_FORMATS = {
+    'txt': ('text/plain; charset=utf-8', iter_txt),
+    'csv': ('text/csv; charset=utf-8', iter_csv),
+    'json': ('application/json', iter_json),
+}
+
+
+def stream_shopping_list(user, export_format):
+    """Генератор строк списка покупок (серверный курсор на PostgreSQL)"""
+    rows = get_shopping_list(user).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    _, render = STREAMING_FORMATS[export_format]
+    return render(rows)
@@ -0,0 +1,280 @@
+import base64
+import io
+import os
+import textwrap
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, Tag
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from .async_views import run_view
+from .serializers import Base64ImageField
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9)
+class RecipeQueryCountTest(TestCase):
+    """
+    Число SQL-запросов списка и страницы рецепта не зависит от количества
+    рецептов, ингредиентов и тэгов.
+    """
+    # COUNT, рецепты с авторами, тэги, ингредиенты, подписки пользователя
+    LIST_QUERIES = 5
+    # рецепт с автором, тэги, ингредиенты, подписки пользователя
+    DETAIL_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        cls.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'tag {i}', color=f'#00000{i}',
+                               slug=f'tag-{i}')
+            for i in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ingredient {i}',
+                                      measurement_unit='г')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count):
+        recipes = [
+            Recipe.objects.create(
+                author=self.author, name=f'recipe {i}', text='text',
+                cooking_time=10
+            )
+            for i in range(count)
+        ]
+        for recipe in recipes:
+            recipe.tags.set(self.tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=1)
+                for ingredient in self.ingredients
+            )
+        Favorite.objects.create(user=self.user, recipe=recipes[0])
+        cache.clear()
+        return recipes
+
+    def assert_list_queries(self, count):
+        self.create_recipes(count)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get(
+                reverse('api:recipes-list'), {'limit': 50}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), count)
+
+    def assert_detail_queries(self, count):
+        recipes = self.create_recipes(count)
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.client.get(
+                reverse('api:recipes-detail', args=[recipes[-1].id])
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['ingredients']), 3)
+
+    def test_list_one_recipe(self):
+        self.assert_list_queries(1)
+
+    def test_list_fifty_recipes(self):
+        self.assert_list_queries(50)
+
+    def test_detail_one_recipe(self):
+        self.assert_detail_queries(1)
+
+    def test_detail_fifty_recipes(self):
+        self.assert_detail_queries(50)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9)
+class RecipeSearchTest(TestCase):
+    """Поиск без слов в запросе возвращает пустой список"""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        Recipe.objects.create(
+            author=author, name='recipe', text='text', cooking_time=10
+        )
+
+    def test_query_without_words(self):
+        for search in ('"', '*', '-'):
+            with self.subTest(search=search):
+                response = APIClient().get(
+                    reverse('api:recipes-list'), {'search': search}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], 0)
+                self.assertEqual(response.data['results'], [])
+
+    def test_query_with_words(self):
+        response = APIClient().get(
+            reverse('api:recipes-list'), {'search': 'recipe'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9)
+class IngredientSearchTest(TestCase):
+    """
+    Поиск ингредиентов в БД и в индексе в памяти: без учета регистра
+    кириллицы, сначала совпадения по началу названия.
+    """
+    NAMES = ('Ванильный сахар', 'Сахарная пудра', 'Соль', 'Сахар')
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in cls.NAMES:
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        """Ответы поиска в БД и в памяти: [(in_memory, response)]"""
+        responses = []
+        for in_memory in (False, True):
+            with override_settings(INGREDIENT_SEARCH_IN_MEMORY=in_memory):
+                responses.append((in_memory, APIClient().get(
+                    reverse('api:ingredients-list'), params
+                )))
+        return responses
+
+    def assert_found(self, names, **params):
+        for in_memory, response in self.search(**params):
+            with self.subTest(in_memory=in_memory, **params):
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [ingredient['name'] for ingredient in response.data],
+                    names
+                )
+
+    def test_prefix_matches_first(self):
+        self.assert_found(
+            ['Сахар', 'Сахарная пудра', 'Ванильный сахар'], name='сах'
+        )
+
+    def test_cyrillic_case(self):
+        for name in ('са', 'СА', 'Са', 'сА'):
+            self.assert_found(
+                ['Сахар', 'Сахарная пудра', 'Ванильный сахар'], name=name
+            )
+
+    def test_limit(self):
+        self.assert_found(['Сахар', 'Сахарная пудра'], name='сах', limit=2)
+
+    def test_invalid_limit(self):
+        for limit in ('0', '101', 'x'):
+            for in_memory, response in self.search(name='сах', limit=limit):
+                with self.subTest(in_memory=in_memory, limit=limit):
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('limit', response.data)
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    """Декодирование картинки из data URI частями"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # шум не сжимается: png больше одной части декодирования
+        image = Image.frombytes('RGB', (300, 300), os.urandom(300 * 300 * 3))
+        output = io.BytesIO()
+        image.save(output, 'PNG')
+        cls.png = output.getvalue()
+        cls.encoded = base64.b64encode(cls.png).decode()
+
+    def decode(self, data):
+        image = Base64ImageField().to_internal_value(data)
+        self.addCleanup(image.close)
+        return image
+
+    def assert_fails(self, data, code):
+        with self.assertRaises(ValidationError) as context:
+            self.decode(data)
+        self.assertEqual(context.exception.get_codes(), [code])
+
+    def test_decode(self):
+        self.assertGreater(len(self.encoded), Base64ImageField.CHUNK_SIZE)
+        image = self.decode('data:image/png;base64,' + self.encoded)
+        self.assertEqual(image.size, len(self.png))
+        self.assertTrue(image.name.endswith('.png'))
+
+    def test_wrapped(self):
+        for separator in ('\n', '\r\n', ' '):
+            with self.subTest(separator=separator):
+                image = self.decode('data:image/png;base64,' + separator.join(
+                    textwrap.wrap(self.encoded, 76)
+                ))
+                image.seek(0)
+                self.assertEqual(image.read(), self.png)
+
+    def test_not_base64(self):
+        for payload in ('!!!!', '', 'QUJD=', '****' * 100):
+            with self.subTest(payload=payload):
+                self.assert_fails(
+                    'data:image/png;base64,' + payload, 'invalid_image'
+                )
+
+    def test_not_image(self):
+        # содержимое проверяет ImageField Django
+        with self.assertRaises(DjangoValidationError) as context:
+            self.decode(
+                'data:image/png;base64,' + base64.b64encode(b'abc').decode()
+            )
+        self.assertEqual(context.exception.code, 'invalid_image')
+
+    def test_extension(self):
+        for mime in ('svg+xml', 'png/../../x', ''):
+            with self.subTest(mime=mime):
+                self.assert_fails(
+                    f'data:image/{mime};base64,' + self.encoded,
+                    'invalid_image'
+                )
+
+    def test_max_size(self):
+        with override_settings(RECIPE_IMAGE_MAX_SIZE=len(self.png) - 1):
+            self.assert_fails(
+                'data:image/png;base64,' + self.encoded, 'max_size'
+            )
+        with override_settings(RECIPE_IMAGE_MAX_SIZE=len(self.png)):
+            self.decode('data:image/png;base64,' + self.encoded)
+
+
+class RunViewTest(SimpleTestCase):
+    """Ответ асинхронного view сохраняет заголовки и cookies"""
+
+    def test_cookies(self):
+        def view(request):
+            response = HttpResponse('ok', headers={'X-Test': '1'})
+            response.set_cookie('name', 'value', httponly=True)
+            return response
+
+        response = run_view(view, RequestFactory().get('/'))
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(response['X-Test'], '1')
+        self.assertEqual(response.cookies['name'].value, 'value')
+        self.assertTrue(response.cookies['name']['httponly'])
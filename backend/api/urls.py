@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
@@ -14,3 +15,25 @@ urlpatterns = [
     path('', include(router_v1.urls)),
     path('', include('users.urls'))
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    from . import async_views
+
+    # перекрывают маршруты router_v1 с теми же адресами
+    urlpatterns = [
+        # имена как у маршрутов router_v1 (по ним размечаются метрики)
+        path('tags/', async_views.tag_list, name='tags-list'),
+        path(
+            'ingredients/', async_views.ingredient_list,
+            name='ingredients-list'
+        ),
+        path(
+            'recipes/<int:pk>/', async_views.recipe_detail,
+            name='recipes-detail'
+        ),
+        path(
+            'recipes/download_shopping_cart/',
+            async_views.download_shopping_cart,
+            name='recipes-download-shopping-cart'
+        ),
+    ] + urlpatterns
@@ -1,31 +1,67 @@
+import hashlib
 import io
-import os
+import json
 
 from django.conf import settings
-from django.db.models import Sum
-from django.http import FileResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from recipes import versions
 from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
-from reportlab.pdfbase import pdfmetrics, ttfonts
-from reportlab.pdfgen import canvas
-from rest_framework import status, viewsets
+from rest_framework import exceptions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from users.pagination import CustomPageNumberPagination
+from users.pagination import RecipePagination
 from users.serializers import RecipeShortListSerializer
 
+from .cache import cached_response
+from .conditional import versioned
+from .pdf import render_shopping_list
 from .permissions import IsAuthenticatedAuthor
+from .search import ingredient_index
 from .serializers import (IngredientSerializer, RecipeSerializer,
                           RecipeWriteSerializer, TagSerializer)
+from .shopping_list import (STREAMING_FORMATS, get_shopping_list,
+                            stream_shopping_list)
 
 app_name = 'api'
 
 
+def recipe_versions(request, pk, **kwargs):
+    names = [
+        versions.recipe(pk), versions.TAGS, versions.INGREDIENTS,
+        versions.USERS
+    ]
+    if request.user.is_authenticated:
+        names.extend(versions.user_state(request.user.pk))
+    return names
+
+
+def recipe_list_versions(request, **kwargs):
+    names = [
+        versions.RECIPES, versions.TAGS, versions.INGREDIENTS, versions.USERS
+    ]
+    if request.user.is_authenticated:
+        names.extend(versions.user_state(request.user.pk))
+    return names
+
+
+def ingredient_versions(request, **kwargs):
+    return [versions.INGREDIENTS]
+
+
+def tag_versions(request, **kwargs):
+    return [versions.TAGS]
+
+
 class RecipeViewSet(viewsets.ModelViewSet):
     """View рецептов"""
     QUERY_PARAMS_FAVORITE_TRUE = '1'
     QUERY_PARAMS_FAVORITE_FALSE = '0'
+    QUERY_PARAMS_TAGS_MODES = ('any', 'all')
 
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = (
@@ -33,19 +69,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     lookup_field = 'pk'
     permission_classes = [IsAuthenticatedAuthor, ]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = RecipePagination
 
     def get_queryset(self):
-        qset = Recipe.objects.prefetch_related('tags', 'ingredients')
+        user = self.request.user
+        qset = Recipe.objects.select_related('author').prefetch_related(
+            'tags'
+        ).with_amounts().with_user_flags(user)
         tags = self.request.query_params.getlist('tags')
         is_favorited = self.request.query_params.get('is_favorited')
         is_in_shopping_cart = self.request.query_params.get(
                 'is_in_shopping_cart'
         )
-        user = self.request.user
 
         if len(tags):
-            qset = qset.filter(tags__slug__in=tags)
+            qset = qset.with_tags(
+                tags, match_all=self.get_tags_mode() == 'all'
+            )
+
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            # при ?cursor= порядок задает курсорная пагинация
+            qset = qset.search(search).order_by(
+                '-search_rank', '-pub_date', '-id'
+            )
 
         if user.is_anonymous:
             return qset
@@ -62,11 +109,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return qset
 
+    def get_tags_mode(self):
+        """?tags_mode=any (по умолчанию) или all"""
+        tags_mode = self.request.query_params.get('tags_mode') or 'any'
+        if tags_mode not in self.QUERY_PARAMS_TAGS_MODES:
+            raise exceptions.ValidationError(
+                {'tags_mode': 'Ожидается одно из значений: any, all'}
+            )
+        return tags_mode
+
+    @versioned(recipe_versions, vary_on_user=True)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @cached_response(recipe_list_versions)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def perform_content_negotiation(self, request, force=False):
+        # в download_shopping_cart ?format= выбирает формат файла,
+        # а не рендерер DRF
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return RecipeWriteSerializer
         return RecipeSerializer
 
+    @transaction.atomic
     def update_bool_field(self, request, pk, klass, field):
         """
         Добавляет/удаляет рецепт из списков is_in_shopping_cart, is_favorite.
@@ -108,46 +180,47 @@ class RecipeViewSet(viewsets.ModelViewSet):
             request, pk, Favorite, 'is_favorited'
         )
 
-    @action(detail=False, methods=['get'], url_path='download_shopping_cart')
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='download_shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
     def download_shopping_cart(self, request):
+        """
+        Список покупок в pdf (по умолчанию) или потоком в ?format=txt|csv|json.
+        """
+        export_format = request.query_params.get('format', 'pdf')
+        if export_format in STREAMING_FORMATS:
+            content_type, _ = STREAMING_FORMATS[export_format]
+            response = StreamingHttpResponse(
+                stream_shopping_list(request.user, export_format),
+                content_type=content_type
+            )
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_cart.{export_format}"'
+            )
+            return response
+        if export_format != 'pdf':
+            error = {
+                'errors': f'Unsupported format {export_format}'
+            }
+            return Response(error, status.HTTP_400_BAD_REQUEST)
 
-        ingredients = Ingredient.objects.filter(
-            recipes__is_in_shopping_cart__user=request.user
-        )
-        ingredients = ingredients.annotate(Sum('amounts__amount'))
+        items = list(get_shopping_list(request.user))
 
-        buffer = io.BytesIO()
+        # одинаковый список покупок дает одинаковый pdf, поэтому ключ кэша -
+        # хэш содержимого, а не пользователь
+        key = 'shopping-cart-pdf:' + hashlib.sha256(
+            json.dumps(items, ensure_ascii=False).encode()
+        ).hexdigest()
+        pdf = cache.get(key)
+        if pdf is None:
+            pdf = render_shopping_list(items)
+            cache.set(key, pdf, settings.SHOPPING_CART_PDF_CACHE_TIMEOUT)
 
-        pdf_report = canvas.Canvas(buffer)
-        pdfmetrics.registerFont(
-            ttfonts.TTFont(
-                'TNR',
-                os.path.join(settings.BASE_DIR, 'api/fonts/Times.ttf'),
-                'UTF-8'
-            )
-        )
-        pdf_report.setFont('TNR', size=24)
-        pdf_report.drawString(100, 750, "Список покупок")
-        pdf_report.setFont('TNR', size=18)
-        number_of_bullets_on_page = 20
-        for i, item in enumerate(ingredients):
-            line = (f'\u2022 {item.name}, {item.measurement_unit}: '
-                    f'{item.amounts__amount__sum}'
-                    )
-            pos = 720-(i % number_of_bullets_on_page)*20
-            pdf_report.drawString(100, pos, line)
-            if i % number_of_bullets_on_page == number_of_bullets_on_page-1:
-                pdf_report.showPage()
-                pdf_report.setFont('TNR', size=24)
-                pdf_report.drawString(100, 750, "Список покупок (продолжение)")
-                pdf_report.setFont('TNR', size=18)
-
-        pdf_report.showPage()
-        pdf_report.save()
-
-        buffer.seek(0)
         return FileResponse(
-            buffer,
+            io.BytesIO(pdf),
             as_attachment=True,
             filename='shopping_cart.pdf'
         )
@@ -160,6 +233,44 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     lookup_field = 'pk'
 
+    def get_search_limit(self):
+        limit = self.request.query_params.get('limit')
+        if not limit:
+            return settings.INGREDIENT_SEARCH_LIMIT
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= settings.INGREDIENT_SEARCH_MAX_LIMIT:
+            raise exceptions.ValidationError({
+                'limit': (
+                    'Ожидается целое число от 1 до '
+                    f'{settings.INGREDIENT_SEARCH_MAX_LIMIT}'
+                )
+            })
+        return limit
+
+    def get_queryset(self):
+        name = self.request.query_params.get('name')
+        if self.action != 'list' or not name:
+            return super().get_queryset()
+        return Ingredient.objects.search(name)[:self.get_search_limit()]
+
+    @versioned(ingredient_versions)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @versioned(ingredient_versions)
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name and settings.INGREDIENT_SEARCH_IN_MEMORY:
+            ingredients = ingredient_index.search(
+                name, self.get_search_limit()
+            )
+            serializer = self.get_serializer(ingredients, many=True)
+            return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """View рецептов"""
@@ -167,3 +278,11 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TagSerializer
     pagination_class = None
     lookup_field = 'pk'
+
+    @versioned(tag_versions)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @versioned(tag_versions)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
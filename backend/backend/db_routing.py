@@ -0,0 +1,125 @@
+"""
+Чтение с реплик БД (settings.DATABASE_REPLICAS).
+
+На реплики уходят только запросы на чтение из безопасных (GET, HEAD,
+OPTIONS) HTTP-запросов. Все остальное - запись, изменяющие запросы,
+команды manage.py - идет в основную БД. После изменяющего запроса
+клиент (токен или сессия) DB_REPLICA_STICKY_SECONDS секунд читает из
+основной БД, чтобы увидеть свои изменения раньше, чем они дойдут до
+реплики. Так же ответы, проверяемые по версиям данных (recipes.versions),
+читаются из основной БД DB_REPLICA_STICKY_SECONDS секунд после изменения
+данных.
+"""
+import asyncio
+import hashlib
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY = 'default'
+
+# вне HTTP-запросов (команды, обработчики) читаем из основной БД
+use_primary = ContextVar('use_primary', default=True)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if use_primary.get() or not settings.DATABASE_REPLICAS:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики - копии основной БД
+        return True
+
+
+def use_primary_after_change(changed_at):
+    """
+    Читать из основной БД, если данные менялись (время changed_at) меньше
+    DB_REPLICA_STICKY_SECONDS секунд назад: иначе данные с отстающей
+    реплики получат ETag или ключ кэша новой версии и останутся в ответах
+    до следующего изменения.
+    """
+    if time.time() - changed_at < settings.DB_REPLICA_STICKY_SECONDS:
+        use_primary.set(True)
+
+
+def client_sticky_key(client):
+    return 'db-sticky:' + hashlib.sha1(client.encode()).hexdigest()
+
+
+def sticky_key(request):
+    client = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not client:
+        return None
+    return client_sticky_key(client)
+
+
+class ReadReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # как в MiddlewareMixin: Django увидит асинхронный middleware
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def read_from_primary(self, request):
+        key = sticky_key(request)
+        if request.method not in SAFE_METHODS:
+            if key is not None:
+                cache.set(key, True, settings.DB_REPLICA_STICKY_SECONDS)
+            return True
+        return key is not None and bool(cache.get(key))
+
+    def stick_new_token(self, response):
+        """
+        Запрос входа идет без Authorization, поэтому клиент с выданным
+        токеном тоже читает из основной БД: иначе первый запрос с токеном
+        может не найти его на отстающей реплике и получить 401.
+        """
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and data.get('auth_token'):
+            cache.set(
+                client_sticky_key(f'Token {data["auth_token"]}'), True,
+                settings.DB_REPLICA_STICKY_SECONDS
+            )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        token = use_primary.set(self.read_from_primary(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        self.stick_new_token(response)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        # обращения к кэшу (memcached, файлы) блокируют цикл событий
+        token = use_primary.set(
+            await sync_to_async(self.read_from_primary)(request)
+        )
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        await sync_to_async(self.stick_new_token)(response)
+        return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,10 +37,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
     'api.apps.ApiConfig',
+    'monitoring.apps.MonitoringConfig',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'backend.db_routing.ReadReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +84,43 @@ DATABASES = {
     }
 }
 
+# реплики только для чтения (backend/db_routing.py): DB_REPLICA_HOSTS -
+# хосты реплик PostgreSQL через запятую; DB_REPLICA_NAMES - файлы SQLite
+# для проверки маршрутизации локально
+for key, variable in (('HOST', 'DB_REPLICA_HOSTS'),
+                      ('NAME', 'DB_REPLICA_NAMES')):
+    for value in filter(None, os.getenv(variable, default='').split(',')):
+        DATABASES[f'replica_{len(DATABASES)}'] = {
+            **DATABASES['default'],
+            key: value,
+            'TEST': {'MIRROR': 'default'},
+        }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['backend.db_routing.ReplicaRouter']
+# сколько секунд клиент после изменяющего запроса читает из основной БД
+DB_REPLICA_STICKY_SECONDS = int(
+    os.getenv('DB_REPLICA_STICKY_SECONDS', default=10)
+)
+
+# кэш общий для всех процессов: в нем хранятся версии данных
+# (recipes/versions.py), по которым строятся ETag и сбрасываются кэши.
+# Кэш процесса (LocMemCache) не видел бы изменений из других воркеров,
+# process_images и команд manage.py и отдавал бы устаревшие 304.
+# По умолчанию - файловый кэш (общий на одной машине), в docker-compose -
+# memcached
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            default=os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': ('django.contrib.auth.password_validation.'
@@ -123,6 +164,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/backend_media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'backend_media')
 
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -138,6 +181,50 @@ REST_FRAMEWORK = {
 
 }
 
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', default=100))
+PAGINATION_COUNT_CACHE_THRESHOLD = 10000
+PAGINATION_COUNT_CACHE_TIMEOUT = 60
+
+SHOPPING_CART_PDF_CACHE_TIMEOUT = 60 * 60
+
+# сколько хранить в кэше ответ списка рецептов; счетчики favorites_count
+# и carts_count в нем могут отставать на это время (0 - не кэшировать)
+RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv('RESPONSE_CACHE_TIMEOUT', default=60)
+)
+
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+# поиск ингредиентов по индексу в памяти процесса вместо запроса к БД
+INGREDIENT_SEARCH_IN_MEMORY = (
+    os.getenv('INGREDIENT_SEARCH_IN_MEMORY', default='False') == 'True'
+)
+
+# асинхронные эндпоинты включаются в backend/asgi.py (запуск под uvicorn);
+# ASYNC_ORM_CONCURRENCY - сколько их обращений к ORM выполняется сразу
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+ASYNC_ORM_CONCURRENCY = int(os.getenv('ASYNC_ORM_CONCURRENCY', default=16))
+
+# как часто метрики процесса сохраняются в кэш для /api/_metrics, секунд
+METRICS_FLUSH_SECONDS = int(os.getenv('METRICS_FLUSH_SECONDS', default=15))
+
+# запись медленных запросов (monitoring/profiling.py, раздел админки
+# Monitoring): порог, доля запросов под cProfile, размер буфера и заголовок,
+# которым сотрудник включает профиль для одного запроса
+PROFILING_THRESHOLD_MS = int(
+    os.getenv('PROFILING_THRESHOLD_MS', default=500)
+)
+PROFILING_SAMPLE_RATE = float(
+    os.getenv('PROFILING_SAMPLE_RATE', default=0.01)
+)
+PROFILING_BUFFER_SIZE = 200
+PROFILING_HEADER = 'X-Profile'
+
+# копии картинок делаются сразу после сохранения рецепта, без process_images
+IMAGE_PROCESSING_INLINE = (
+    os.getenv('IMAGE_PROCESSING_INLINE', default='False') == 'True'
+)
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
 }
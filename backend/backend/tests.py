@@ -0,0 +1,125 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connections
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from recipes import versions
+from recipes.models import Tag
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from .db_routing import ReadReplicaMiddleware, use_primary
+
+# вторая БД SQLite в роли отстающей реплики (как DB_REPLICA_NAMES);
+# тестовая БД для нее создается вместе с основной
+REPLICA = 'replica_test'
+connections.databases.setdefault(REPLICA, {
+    **connections.databases['default'],
+    'NAME': 'replica_test.sqlite3',
+    'TEST': {**connections.databases['default']['TEST'], 'NAME': None},
+})
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReadReplicaMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_new_token_reads_from_primary(self):
+        middleware = ReadReplicaMiddleware(
+            lambda request: Response({'auth_token': 'new-token'})
+        )
+        middleware(self.factory.post('/api/auth/token/login/'))
+
+        request = self.factory.get(
+            '/api/users/me/', HTTP_AUTHORIZATION='Token new-token'
+        )
+        self.assertTrue(middleware.read_from_primary(request))
+
+    def test_new_token_reads_from_primary_async(self):
+        async def get_response(request):
+            return Response({'auth_token': 'async-token'})
+
+        middleware = ReadReplicaMiddleware(get_response)
+        async_to_sync(middleware)(self.factory.post('/api/auth/token/login/'))
+
+        request = self.factory.get(
+            '/api/users/me/', HTTP_AUTHORIZATION='Token async-token'
+        )
+        self.assertTrue(middleware.read_from_primary(request))
+
+    def test_other_token_reads_from_replica(self):
+        middleware = ReadReplicaMiddleware(lambda request: Response({}))
+        request = self.factory.get(
+            '/api/users/me/', HTTP_AUTHORIZATION='Token other-token'
+        )
+        self.assertFalse(middleware.read_from_primary(request))
+
+
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA], DB_REPLICA_STICKY_SECONDS=10,
+    PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9
+)
+class ReplicaRouterTest(TestCase):
+    """
+    Чтение с реплики и из основной БД. Реплика отстает: тэг есть только
+    в основной БД, на реплике - прежний.
+    """
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name='primary', color='#000001', slug='primary')
+        Tag.objects.using(REPLICA).create(
+            name='replica', color='#000002', slug='replica'
+        )
+        token = use_primary.set(False)
+        self.addCleanup(use_primary.reset, token)
+
+    def set_tags_changed(self, seconds_ago):
+        cache.set(
+            f'version:{versions.TAGS}',
+            ('token', time.time() - seconds_ago), None
+        )
+
+    def tag_names(self):
+        return list(Tag.objects.values_list('name', flat=True))
+
+    def test_reads_from_replica(self):
+        self.assertEqual(self.tag_names(), ['replica'])
+
+    def test_writes_to_primary(self):
+        Tag.objects.create(name='new', color='#000003', slug='new')
+        self.assertTrue(Tag.objects.using('default').filter(
+            slug='new'
+        ).exists())
+        self.assertFalse(Tag.objects.using(REPLICA).filter(
+            slug='new'
+        ).exists())
+
+    def test_old_version_reads_from_replica(self):
+        self.set_tags_changed(60)
+        versions.validators(versions.TAGS)
+        self.assertEqual(self.tag_names(), ['replica'])
+
+    def test_fresh_version_reads_from_primary(self):
+        self.set_tags_changed(1)
+        versions.validators(versions.TAGS)
+        self.assertEqual(self.tag_names(), ['primary'])
+
+    def test_api_reads_fresh_version_from_primary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            versions.bump(versions.TAGS)
+        response = APIClient().get(reverse('api:tags-list'))
+        self.assertEqual(
+            [tag['name'] for tag in response.data], ['primary']
+        )
+        self.set_tags_changed(60)
+        response = APIClient().get(reverse('api:tags-list'))
+        self.assertEqual(
+            [tag['name'] for tag in response.data], ['replica']
+        )
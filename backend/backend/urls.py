@@ -2,9 +2,11 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
+from monitoring.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics', metrics, name='metrics'),
     path('api/', include('api.urls')),
 
 ]
@@ -0,0 +1,47 @@
+from django.contrib import admin
+from django.utils.html import format_html, format_html_join
+
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        'created',
+        'method',
+        'path',
+        'view',
+        'status',
+        'duration',
+        'query_count',
+        'db_time',
+        'forced',
+    )
+    list_filter = ('view', 'forced', 'status')
+    search_fields = ('path',)
+    fields = (
+        'created', 'method', 'path', 'view', 'status', 'duration',
+        'query_count', 'db_time', 'forced', 'sql', 'profile_dump',
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def sql(self, obj):
+        return format_html(
+            '<table><tr><th>мс</th><th>место вызова</th><th>SQL</th></tr>'
+            '{}</table>',
+            format_html_join(
+                '', '<tr><td>{:.2f}</td><td>{}</td><td>{}</td></tr>',
+                ((duration, site, sql) for sql, duration, site in obj.queries)
+            )
+        )
+    sql.short_description = 'SQL-запросы'
+
+    def profile_dump(self, obj):
+        return format_html('<pre>{}</pre>', obj.profile or '-')
+    profile_dump.short_description = 'Профиль'
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .serializers import measure_serializers
+        measure_serializers()
@@ -0,0 +1,267 @@
+"""
+Метрики запросов в формате Prometheus.
+
+Для каждого view (имя маршрута: recipes-list, users-subscriptions...)
+считаются гистограммы длительности запроса и числа SQL-запросов, суммарное
+время SQL и время сериализаторов. Метрики копятся в памяти процесса, и
+фоновый поток раз в METRICS_FLUSH_SECONDS сохраняет их в кэш Django (без
+срока хранения, даже если процесс простаивает), откуда /api/_metrics
+собирает их по всем воркерам (для нескольких процессов нужен общий кэш).
+Снимки процессов, не обновлявшиеся дольше METRICS_STALE_FLUSHES
+интервалов, считаются остановленными и удаляются.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'foodgram_request_duration_seconds': (
+        'Длительность запроса', LATENCY_BUCKETS
+    ),
+    'foodgram_db_queries': ('SQL-запросов за запрос', QUERY_BUCKETS),
+}
+COUNTERS = {
+    'foodgram_db_duration_seconds_total': 'Суммарное время SQL-запросов',
+    'foodgram_serializer_duration_seconds_total': (
+        'Суммарное время сериализаторов'
+    ),
+}
+
+PROCESSES_KEY = 'metrics:processes'
+METRICS_STALE_FLUSHES = 10
+
+MONITORING_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+PROJECT_DIR = os.path.dirname(MONITORING_DIR.rstrip(os.sep)) + os.sep
+
+
+class RequestStats:
+    """Накопитель одного запроса (общий для потоков через ContextVar)"""
+    __slots__ = (
+        'queries', 'db_time', 'serializer_time', 'serializing',
+        'statements', 'call_sites',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        # заполняет ProfilingMiddleware: [(sql, секунды, место вызова)]
+        self.statements = None
+        self.call_sites = False
+
+
+current_stats = ContextVar('current_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper для всех соединений с БД"""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        stats.queries += 1
+        stats.db_time += duration
+        if stats.statements is not None:
+            stats.statements.append((
+                sql, duration, call_site() if stats.call_sites else ''
+            ))
+
+
+def call_site():
+    """Первый кадр стека из кода проекта: 'api/views.py:120 in get'"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename.startswith(PROJECT_DIR)
+                and not filename.startswith(MONITORING_DIR)
+                and 'site-packages' not in filename):
+            return (
+                f'{os.path.relpath(filename, PROJECT_DIR)}:'
+                f'{frame.f_lineno} in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return ''
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (метрика, метки) -> [счетчики корзин..., сумма, количество]
+        self._histograms = {}
+        self._counters = defaultdict(float)
+        self._flusher_pid = None
+
+    def _observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        series = self._histograms.setdefault(
+            (name, labels), [0] * len(buckets) + [0.0, 0]
+        )
+        for pos, bound in enumerate(buckets):
+            if value <= bound:
+                series[pos] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def observe(self, view, method, status, duration, stats):
+        request_labels = (
+            ('view', view), ('method', method), ('status', str(status))
+        )
+        view_labels = (('view', view),)
+        with self._lock:
+            self._observe(
+                'foodgram_request_duration_seconds', request_labels, duration
+            )
+            self._observe('foodgram_db_queries', view_labels, stats.queries)
+            self._counters[
+                ('foodgram_db_duration_seconds_total', view_labels)
+            ] += stats.db_time
+            self._counters[
+                ('foodgram_serializer_duration_seconds_total', view_labels)
+            ] += stats.serializer_time
+        self.start_flusher()
+
+    def start_flusher(self):
+        """Запускает поток сохранения метрик (один на процесс)"""
+        pid = os.getpid()
+        # поток родителя не переживает fork (gunicorn --preload)
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(
+            target=self._flush_forever, name='metrics-flush', daemon=True
+        ).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_SECONDS)
+            try:
+                self.flush()
+            except Exception:
+                # кэш недоступен - сохраним в следующий раз
+                pass
+
+    def snapshot(self):
+        with self._lock:
+            return (
+                {
+                    key: list(series)
+                    for key, series in self._histograms.items()
+                },
+                dict(self._counters),
+            )
+
+    def flush(self):
+        """Сохраняет метрики процесса в кэш"""
+        key = f'metrics:process:{socket.gethostname()}:{os.getpid()}'
+        histograms, counters = self.snapshot()
+        cache.set(key, {
+            'heartbeat': time.time(),
+            'histograms': histograms,
+            'counters': counters,
+        }, None)
+        processes = cache.get(PROCESSES_KEY, set())
+        if key not in processes:
+            cache.set(PROCESSES_KEY, processes | {key}, None)
+
+
+registry = Registry()
+
+
+def prune(processes, snapshots):
+    """
+    Удаляет снимки остановленных процессов и возвращает живые. Счетчики
+    остановленного процесса выпадают из суммы, как при перезапуске.
+    """
+    deadline = time.time() - (
+        settings.METRICS_FLUSH_SECONDS * METRICS_STALE_FLUSHES
+    )
+    dead = {
+        key for key in processes
+        if not isinstance(snapshots.get(key), dict)
+        or snapshots[key]['heartbeat'] < deadline
+    }
+    if dead:
+        cache.delete_many(dead)
+        cache.set(
+            PROCESSES_KEY, cache.get(PROCESSES_KEY, set()) - dead, None
+        )
+    return [
+        snapshot for key, snapshot in snapshots.items() if key not in dead
+    ]
+
+
+def collect():
+    """Метрики всех процессов, сложенные вместе"""
+    registry.flush()
+    histograms, counters = {}, defaultdict(float)
+    processes = cache.get(PROCESSES_KEY, set())
+    for snapshot in prune(processes, cache.get_many(processes)):
+        for key, series in snapshot['histograms'].items():
+            total = histograms.setdefault(key, [0] * len(series))
+            for pos, value in enumerate(series):
+                total[pos] += value
+        for key, value in snapshot['counters'].items():
+            counters[key] += value
+    return histograms, counters
+
+
+def format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return ','.join(
+        '{}="{}"'.format(
+            name, value.replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in pairs
+    )
+
+
+def render_histogram(name, buckets, histograms):
+    for (metric, labels), series in sorted(histograms.items()):
+        if metric != name:
+            continue
+        for bound, count in zip(buckets, series):
+            yield (
+                f'{name}_bucket{{{format_labels(labels, le=str(bound))}}}'
+                f' {count}'
+            )
+        yield (
+            f'{name}_bucket{{{format_labels(labels, le="+Inf")}}}'
+            f' {series[-1]}'
+        )
+        yield f'{name}_sum{{{format_labels(labels)}}} {series[-2]}'
+        yield f'{name}_count{{{format_labels(labels)}}} {series[-1]}'
+
+
+def render():
+    """Текст в формате Prometheus (text/plain; version=0.0.4)"""
+    histograms, counters = collect()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        lines += render_histogram(name, buckets, histograms)
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [
+            f'{name}{{{format_labels(labels)}}} {value}'
+            for (metric, labels), value in sorted(counters.items())
+            if metric == name
+        ]
+    return '\n'.join(lines) + '\n'
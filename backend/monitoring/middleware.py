@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+
+from . import profiling
+from .metrics import RequestStats, current_stats, registry
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unmatched'
+    return match.url_name
+
+
+class MetricsMiddleware:
+    """
+    Длительность запроса, SQL и сериализаторы по view (monitoring.metrics),
+    запись медленных запросов (monitoring.profiling). Для потокового ответа
+    учитывается время до начала отправки.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        forced = profiling.is_forced(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        profiler = profiling.start(stats, forced)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            current_stats.reset(token)
+        self.observe(request, response, duration, stats)
+        profiling.finish(
+            request, response, duration, stats, profiler, forced
+        )
+        return response
+
+    async def __acall__(self, request):
+        # аутентификация обращается к БД - только в потоке и с заголовком
+        forced = profiling.requested(request) and await sync_to_async(
+            profiling.is_forced
+        )(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        profiler = profiling.start(stats, forced)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            current_stats.reset(token)
+        self.observe(request, response, duration, stats)
+        await sync_to_async(profiling.finish)(
+            request, response, duration, stats, profiler, forced
+        )
+        return response
+
+    def observe(self, request, response, duration, stats):
+        registry.observe(
+            view_name(request), request.method, response.status_code,
+            duration, stats
+        )
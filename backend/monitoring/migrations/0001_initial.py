@@ -0,0 +1,34 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2000)),
+                ('view', models.CharField(max_length=200)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duration', models.FloatField(verbose_name='длительность, мс')),
+                ('query_count', models.PositiveIntegerField(verbose_name='SQL-запросов')),
+                ('db_time', models.FloatField(verbose_name='время SQL, мс')),
+                ('forced', models.BooleanField(default=False, verbose_name='по заголовку')),
+                ('profile', models.TextField(blank=True)),
+                ('queries', models.JSONField(default=list)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+    ]
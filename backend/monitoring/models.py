@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class RequestProfile(models.Model):
+    """
+    Запись медленного (или отмеченного заголовком) запроса: SQL-запросы
+    с временем и местом вызова, для выборки запросов - профиль cProfile.
+    Хранятся последние PROFILING_BUFFER_SIZE записей.
+    """
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    view = models.CharField(max_length=200)
+    status = models.PositiveSmallIntegerField()
+    duration = models.FloatField('длительность, мс')
+    query_count = models.PositiveIntegerField('SQL-запросов')
+    db_time = models.FloatField('время SQL, мс')
+    forced = models.BooleanField('по заголовку', default=False)
+    profile = models.TextField(blank=True)
+    # [[sql, длительность в мс, место вызова], ...]
+    queries = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration:.0f} мс)'
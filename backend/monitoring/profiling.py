@@ -0,0 +1,107 @@
+"""
+Запись медленных запросов (monitoring.models.RequestProfile).
+
+Для каждого запроса копятся SQL-запросы с временем. Если запрос длился
+дольше PROFILING_THRESHOLD_MS, он сохраняется. Доля запросов
+PROFILING_SAMPLE_RATE выполняется под cProfile и с местами вызова SQL -
+у сохраненных из них есть профиль. Заголовок PROFILING_HEADER от
+сотрудника (is_staff) включает профиль и сохранение для одного запроса;
+от остальных пользователей он игнорируется.
+"""
+import cProfile
+import io
+import pstats
+import random
+
+from django.conf import settings
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+from .metrics import current_stats
+from .models import RequestProfile
+
+PROFILE_LINES = 60
+
+
+def header_key():
+    return 'HTTP_' + settings.PROFILING_HEADER.upper().replace('-', '_')
+
+
+def requested(request):
+    """Запрос с заголовком PROFILING_HEADER"""
+    return bool(request.META.get(header_key()))
+
+
+def is_forced(request):
+    """
+    Заголовок PROFILING_HEADER от сотрудника. Middleware стоит раньше
+    аутентификации, поэтому пользователь определяется здесь классами
+    аутентификации DRF - до включения профилировщика.
+    """
+    if not requested(request):
+        return False
+    for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator().authenticate(request)
+        except exceptions.APIException:
+            return False
+        if result is not None:
+            return result[0].is_staff
+    return False
+
+
+def start(stats, forced):
+    """Готовит сбор данных, возвращает профилировщик или None"""
+    stats.statements = []
+    if not forced and random.random() >= settings.PROFILING_SAMPLE_RATE:
+        return None
+    stats.call_sites = True
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def profile_text(profiler):
+    if profiler is None:
+        return ''
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats(
+        'cumulative'
+    ).print_stats(PROFILE_LINES)
+    return output.getvalue()
+
+
+def finish(request, response, duration, stats, profiler, forced):
+    """Сохраняет запись, если запрос медленный или отмечен сотрудником"""
+    if not forced and duration * 1000 < settings.PROFILING_THRESHOLD_MS:
+        return
+    match = getattr(request, 'resolver_match', None)
+    token = current_stats.set(None)
+    try:
+        RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path()[:2000],
+            view=(match and match.url_name) or 'unmatched',
+            status=response.status_code,
+            duration=duration * 1000,
+            query_count=stats.queries,
+            db_time=stats.db_time * 1000,
+            forced=forced,
+            profile=profile_text(profiler),
+            queries=[
+                [sql, seconds * 1000, site]
+                for sql, seconds, site in stats.statements
+            ],
+        )
+        trim()
+    finally:
+        current_stats.reset(token)
+
+
+def trim():
+    """Оставляет последние PROFILING_BUFFER_SIZE записей"""
+    oldest_kept = RequestProfile.objects.order_by('-id').values_list(
+        'id', flat=True
+    )[settings.PROFILING_BUFFER_SIZE - 1:settings.PROFILING_BUFFER_SIZE]
+    if oldest_kept:
+        RequestProfile.objects.filter(id__lt=oldest_kept[0]).delete()
@@ -0,0 +1,32 @@
+import time
+
+from rest_framework.serializers import BaseSerializer
+
+from .metrics import current_stats
+
+
+def measure_serializers():
+    """
+    Учитывает время BaseSerializer.data в метриках запроса. У DRF нет
+    точки расширения для этого, поэтому свойство оборачивается один раз
+    при запуске. Вложенные вызовы .data (сериализатор внутри
+    SerializerMethodField) не считаются повторно.
+    """
+    data = BaseSerializer.data
+    if getattr(data.fget, 'measured', False):
+        return
+
+    def measured_data(self):
+        stats = current_stats.get()
+        if stats is None or stats.serializing:
+            return data.fget(self)
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+            stats.serializing = False
+
+    measured_data.measured = True
+    BaseSerializer.data = property(measured_data)
@@ -0,0 +1,12 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import record_query
+
+
+@receiver(connection_created)
+def measure_queries(sender, connection, **kwargs):
+    # соединения создаются в каждом потоке, поэтому обертка ставится
+    # на каждое; вне запроса (current_stats пуст) она ничего не делает
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,107 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import metrics
+from .models import RequestProfile
+
+User = get_user_model()
+
+DEAD_KEY = 'metrics:process:gone:1'
+DEAD_COUNTER = ('foodgram_db_duration_seconds_total', (('view', 'dead'),))
+
+
+@override_settings(METRICS_FLUSH_SECONDS=15)
+class CollectTest(TestCase):
+    """Снимки остановленных процессов не попадают в сумму и удаляются"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dead_process_is_pruned(self):
+        stale = time.time() - 15 * metrics.METRICS_STALE_FLUSHES - 1
+        cache.set(DEAD_KEY, {
+            'heartbeat': stale,
+            'histograms': {},
+            'counters': {DEAD_COUNTER: 5.0},
+        }, None)
+        cache.set(metrics.PROCESSES_KEY, {DEAD_KEY}, None)
+
+        _, counters = metrics.collect()
+
+        self.assertNotIn(DEAD_COUNTER, counters)
+        self.assertIsNone(cache.get(DEAD_KEY))
+        processes = cache.get(metrics.PROCESSES_KEY)
+        self.assertNotIn(DEAD_KEY, processes)
+        self.assertEqual(len(processes), 1)
+
+    def test_expired_key_is_dropped_from_set(self):
+        cache.set(metrics.PROCESSES_KEY, {DEAD_KEY}, None)
+        metrics.collect()
+        self.assertNotIn(DEAD_KEY, cache.get(metrics.PROCESSES_KEY))
+
+    def test_idle_process_is_flushed_by_timer(self):
+        registry = metrics.Registry()
+        with override_settings(METRICS_FLUSH_SECONDS=0.01):
+            registry.start_flusher()
+            time.sleep(0.2)
+        self.assertEqual(len(cache.get(metrics.PROCESSES_KEY, set())), 1)
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9)
+class ForcedProfileTest(TestCase):
+    """Заголовок X-Profile включает профилировщик только сотрудникам"""
+
+    def request(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token = Token.objects.create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with mock.patch(
+            'monitoring.profiling.cProfile.Profile'
+        ) as profile:
+            response = client.get(
+                reverse('api:tags-list'), HTTP_X_PROFILE='1'
+            )
+        self.assertEqual(response.status_code, 200)
+        return profile
+
+    def test_staff(self):
+        staff = User.objects.create(
+            username='staff', email='staff@example.com', is_staff=True
+        )
+        self.assertTrue(self.request(staff).called)
+        self.assertTrue(RequestProfile.objects.get().forced)
+
+    def test_user(self):
+        user = User.objects.create(username='user', email='user@example.com')
+        self.assertFalse(self.request(user).called)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_anonymous(self):
+        self.assertFalse(self.request().called)
+        self.assertFalse(RequestProfile.objects.exists())
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9)
+class ViewLabelTest(TestCase):
+    """Метка view - имя маршрута с путем действия"""
+
+    def test_user_actions(self):
+        user = User.objects.create(username='user', email='user@example.com')
+        client = APIClient()
+        client.force_authenticate(user)
+        for path in ('/api/users/me/', '/api/users/subscriptions/'):
+            self.assertEqual(client.get(path).status_code, 200)
+        histograms, _ = metrics.registry.snapshot()
+        views = {
+            dict(labels)['view'] for name, labels in histograms
+            if name == 'foodgram_db_queries'
+        }
+        self.assertLessEqual({'users-me', 'users-subscriptions'}, views)
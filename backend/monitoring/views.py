@@ -0,0 +1,14 @@
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+from .metrics import render
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Метрики в формате Prometheus (только для администраторов)"""
+    return HttpResponse(
+        render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
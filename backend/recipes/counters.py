@@ -0,0 +1,66 @@
+"""
+Денормализованные счетчики: избранное и корзины рецепта, рецепты и
+подписчики пользователя.
+
+Счетчики меняются выражениями F() в сигналах при создании и удалении
+связей, поэтому не требуют агрегации при чтении. Обычный save()
+объекта счетчики не записывает (DenormalizedCountersMixin в
+users/models.py). Расхождения (загрузка фикстур, правка БД вручную)
+исправляет manage.py reconcile_counters.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Follow
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+# (модель со счетчиком, поле счетчика, модель связи, внешний ключ связи)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def change(model, pk, field, delta):
+    """Меняет счетчик field объекта pk на delta, не уходя ниже нуля"""
+    objects = model.objects.filter(pk=pk)
+    if delta < 0:
+        objects = objects.filter(**{f'{field}__gte': -delta})
+    objects.update(**{field: F(field) + delta})
+
+
+def actual_count(related_model, foreign_key):
+    return Coalesce(
+        Subquery(
+            related_model.objects.filter(
+                **{foreign_key: OuterRef('pk')}
+            ).order_by().values(foreign_key).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+def reconcile(check=False):
+    """
+    Сверяет счетчики с пересчетом и исправляет их (check=True - только
+    сверяет). Возвращает {поле: количество расходившихся объектов}.
+    """
+    drift = {}
+    for model, field, related_model, foreign_key in COUNTERS:
+        wrong = model.objects.alias(
+            actual=actual_count(related_model, foreign_key)
+        ).exclude(**{field: F('actual')})
+        if check:
+            drift[field] = wrong.count()
+        else:
+            drift[field] = model.objects.filter(
+                pk__in=wrong.values('pk')
+            ).update(**{field: actual_count(related_model, foreign_key)})
+    return drift
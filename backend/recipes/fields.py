@@ -0,0 +1,74 @@
+"""
+Хранение картинок по хэшу содержимого.
+
+Файл сохраняется как <upload_to>/<первые 2 символа>/<sha256>.<ext>:
+одинаковые загрузки ссылаются на один файл, а содержимое по имени никогда
+не меняется, поэтому его можно отдавать с Cache-Control: immutable.
+Файлы, на которые не ссылается ни один рецепт, удаляет manage.py
+collect_orphan_images.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.db.models.fields.files import ImageField, ImageFieldFile
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def touch(storage, name):
+    """
+    Обновляет время изменения существующего файла name и возвращает True
+    (False - файла нет). Повторно использованный файл становится
+    "свежим", и collect_orphan_images не удалит его в течение --grace,
+    пока ссылающийся на него рецепт еще не сохранен. Для хранилищ без
+    локальных путей время не обновляется.
+    """
+    if not storage.exists(name):
+        return False
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        return True
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        # файл удалили между проверкой и обновлением
+        return False
+    return True
+
+
+class ContentAddressedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        name = posixpath.join(
+            self.field.upload_to, digest[:2], digest + extension
+        )
+        if touch(self.storage, name):
+            self.name = name
+        else:
+            self.name = self.storage.save(
+                name, content, max_length=self.field.max_length
+            )
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ContentAddressedImageField(ImageField):
+    """ImageField, сохраняющий файлы под хэшем содержимого"""
+    attr_class = ContentAddressedImageFieldFile
+
+    def __init__(self, *args, upload_to='', **kwargs):
+        if callable(upload_to):
+            raise TypeError('upload_to должен быть строкой')
+        super().__init__(*args, upload_to=upload_to, **kwargs)
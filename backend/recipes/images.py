@@ -0,0 +1,129 @@
+"""
+Уменьшенные копии (renditions) картинок рецептов.
+
+Имена копий выводятся из имени оригинала, поэтому хранить их в БД
+не нужно: recipes/abc.jpg -> recipes/abc_card.webp, recipes/abc_card.jpeg...
+
+Копии делаются не в запросе, а фоновой обработкой (manage.py process_images):
+сохранение новой картинки переводит рецепт в статус pending, обработчик
+забирает такие рецепты по одному и ставит статус ready или failed.
+"""
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, features
+
+from . import versions
+from .models import ImageStatus, Recipe
+
+RENDITIONS = {
+    'card': (600, 400),
+    'detail': (1200, 800),
+}
+FORMATS = {
+    extension: pil_format
+    for extension, pil_format, feature in (
+        ('webp', 'WEBP', 'webp'),
+        ('jpeg', 'JPEG', 'jpg'),
+    )
+    if features.check(feature)
+}
+QUALITY = 82
+
+
+def rendition_name(image_name, rendition, extension):
+    base, _ = os.path.splitext(image_name)
+    return f'{base}_{rendition}.{extension}'
+
+
+def has_renditions(image):
+    rendition = next(iter(RENDITIONS))
+    extension = next(iter(FORMATS))
+    return image.storage.exists(
+        rendition_name(image.name, rendition, extension)
+    )
+
+
+def make_renditions(image):
+    """Сохраняет копии картинки image (FieldFile) всех размеров и форматов"""
+    image.open('rb')
+    try:
+        with Image.open(image) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+    finally:
+        image.close()
+    for rendition, size in RENDITIONS.items():
+        resized = original.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension, pil_format in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pil_format, quality=QUALITY)
+            name = rendition_name(image.name, rendition, extension)
+            if image.storage.exists(name):
+                image.storage.delete(name)
+            image.storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def rendition_urls(image):
+    """{rendition: {extension: url}} для картинки image (FieldFile)"""
+    return {
+        rendition: {
+            extension: image.storage.url(
+                rendition_name(image.name, rendition, extension)
+            )
+            for extension in FORMATS
+        }
+        for rendition in RENDITIONS
+    }
+
+
+def rendition_source(name):
+    """Имя оригинала без расширения для имени копии или None"""
+    base, _ = os.path.splitext(name)
+    for rendition in RENDITIONS:
+        if base.endswith(f'_{rendition}'):
+            return base[:-len(rendition) - 1]
+    return None
+
+
+def process_recipe_image(recipe):
+    """Делает копии картинки рецепта и возвращает новый статус"""
+    # одинаковые картинки хранятся в одном файле, копии могут уже быть
+    if has_renditions(recipe.image):
+        return ImageStatus.READY
+    try:
+        make_renditions(recipe.image)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return ImageStatus.FAILED
+    return ImageStatus.READY
+
+
+def process_pending_images(limit=None, recipe_ids=None):
+    """
+    Обрабатывает рецепты в статусе pending, возвращает их количество.
+    Каждый рецепт забирается в своей транзакции через SELECT ... FOR UPDATE
+    SKIP LOCKED, поэтому обработчиков может быть несколько.
+    """
+    pending = Recipe.objects.filter(
+        image_status=ImageStatus.PENDING
+    ).order_by('id').only('id', 'image')
+    if recipe_ids is not None:
+        pending = pending.filter(id__in=recipe_ids)
+    processed = 0
+    while limit is None or processed < limit:
+        with transaction.atomic():
+            recipe = pending.select_for_update(skip_locked=True).first()
+            if recipe is None:
+                break
+            status = process_recipe_image(recipe)
+            # картинку могли заменить, пока делались копии
+            Recipe.objects.filter(
+                pk=recipe.pk,
+                image=recipe.image.name,
+                image_status=ImageStatus.PENDING,
+            ).update(image_status=status)
+            versions.bump_recipes(recipe.pk)
+        processed += 1
+    return processed
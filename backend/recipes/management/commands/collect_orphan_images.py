@@ -0,0 +1,64 @@
+import os
+import posixpath
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from recipes.images import rendition_source
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки рецептов и их копии, на которые не ссылается '
+        'ни один рецепт.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=60,
+            help='Не трогать файлы моложе этого количества минут: '
+                 'рецепт с только что загруженной картинкой еще может '
+                 'быть не сохранен'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, ничего не удаляя'
+        )
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        referenced = set(
+            Recipe.objects.exclude(image='').exclude(
+                image__isnull=True
+            ).values_list('image', flat=True).iterator()
+        )
+        referenced_bases = {os.path.splitext(name)[0] for name in referenced}
+        deadline = timezone.now() - timedelta(minutes=options['grace'])
+
+        removed = 0
+        for name in self.walk(field.storage, field.upload_to.rstrip('/')):
+            if name in referenced:
+                continue
+            if rendition_source(name) in referenced_bases:
+                continue
+            if field.storage.get_modified_time(name) > deadline:
+                continue
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                field.storage.delete(name)
+            removed += 1
+        verb = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} неиспользуемых файлов: {removed}'
+        ))
+
+    def walk(self, storage, path):
+        if not storage.exists(path):
+            return
+        directories, files = storage.listdir(path)
+        for name in files:
+            yield posixpath.join(path, name)
+        for directory in directories:
+            yield from self.walk(storage, posixpath.join(path, directory))
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes import versions
+from recipes.models import Ingredient
+
+BATCH_SIZE = 5000
+JSON_READ_SIZE = 64 * 1024
+HEADER = ('name', 'measurement_unit')
+
+
+def iter_csv(file):
+    """Строки CSV: название,единица измерения (заголовок необязателен)"""
+    for row in csv.reader(file):
+        if len(row) >= 2 and tuple(row[:2]) != HEADER:
+            yield row[0], row[1]
+
+
+def iter_json_array(file):
+    """Элементы JSON-массива по одному, не читая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n[,]':
+            pos += 1
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[pos:].strip():
+                    raise
+                return
+            chunk = file.read(JSON_READ_SIZE)
+            buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            continue
+        yield item
+        pos = end
+
+
+def iter_json(file):
+    """Объекты {name, measurement_unit} или фикстура loaddata"""
+    for item in iter_json_array(file):
+        fields = item.get('fields', item)
+        yield fields['name'], fields['measurement_unit']
+
+
+READERS = {'csv': iter_csv, 'json': iter_json}
+
+
+def clean(rows):
+    for name, measurement_unit in rows:
+        name, measurement_unit = name.strip(), measurement_unit.strip()
+        if name and measurement_unit:
+            yield name, measurement_unit
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV или JSON пакетами. Уже существующие '
+        'ингредиенты (unique_ingredient) пропускаются, их pk не меняются, '
+        'поэтому команду можно запускать повторно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .json')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла, по умолчанию - по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество строк в одном пакете'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1][1:]
+        if file_format not in READERS:
+            raise CommandError(
+                'Не удалось определить формат файла, укажите --format'
+            )
+        before = Ingredient.objects.count()
+        try:
+            with open(path, encoding='utf-8', newline='') as file:
+                rows = clean(READERS[file_format](file))
+                with transaction.atomic():
+                    processed = self.load(rows, options['batch_size'])
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Ошибка чтения {path}: {error!r}')
+        added = Ingredient.objects.count() - before
+        if added:
+            versions.bump(versions.INGREDIENTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed}, добавлено ингредиентов: {added}'
+        ))
+
+    def load(self, rows, batch_size):
+        if connection.vendor == 'postgresql':
+            insert = self.copy_batch
+            self.create_staging_table()
+        else:
+            insert = self.bulk_create_batch
+        processed = 0
+        for batch in batches(rows, batch_size):
+            insert(batch)
+            processed += len(batch)
+            self.stdout.write(f'Обработано строк: {processed}')
+        return processed
+
+    def bulk_create_batch(self, batch):
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in batch
+            ),
+            ignore_conflicts=True
+        )
+
+    def create_staging_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+
+    def copy_batch(self, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_import '
+                'ON CONFLICT ON CONSTRAINT unique_ingredient DO NOTHING'
+            )
+            cursor.execute('TRUNCATE ingredient_import')
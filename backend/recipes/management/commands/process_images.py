@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from recipes.images import process_pending_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Делает уменьшенные копии картинок рецептов в статусе pending. '
+        'С --loop работает как фоновый обработчик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, проверять очередь каждые --interval секунд'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2,
+            help='Пауза между проверками пустой очереди, секунд'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50,
+            help='Сколько картинок обработать за один проход'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_images(limit=options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано картинок: {processed}')
+            if not options['loop']:
+                return
+            if processed < options['batch_size']:
+                time.sleep(options['interval'])
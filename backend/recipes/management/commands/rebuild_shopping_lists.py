@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingListItem
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает материализованные списки покупок из корзин '
+        'и проверяет, что они совпадают с пересчетом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                ShoppingListItem.objects.all().delete()
+                ShoppingListItem.objects.bulk_create(
+                    (
+                        ShoppingListItem(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            total_amount=total_amount
+                        )
+                        for user_id, ingredient_id, total_amount
+                        in ShoppingListItem.objects.compute().iterator()
+                    ),
+                    batch_size=BATCH_SIZE
+                )
+            self.stdout.write('Списки покупок пересобраны')
+
+        expected = set(ShoppingListItem.objects.compute())
+        stored = set(
+            ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            )
+        )
+        if expected != stored:
+            raise CommandError(
+                f'Расхождение: {len(stored - expected)} лишних или '
+                f'неверных строк, {len(expected - stored)} отсутствует'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено строк: {len(stored)}'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет денормализованные счетчики (favorites_count, carts_count, '
+        'recipes_count, followers_count) с пересчетом и исправляет их.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile(check=options['check'])
+        for field, count in drift.items():
+            self.stdout.write(f'{field}: {count}')
+        if options['check'] and any(drift.values()):
+            raise CommandError('Счетчики расходятся с пересчетом')
+        self.stdout.write(self.style.SUCCESS(
+            'Счетчики совпадают' if options['check']
+            else f'Исправлено объектов: {sum(drift.values())}'
+        ))
@@ -0,0 +1,286 @@
+import itertools
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from recipes import versions
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F2C94C', 'dessert'),
+    ('Выпечка', '#B0726A', 'bakery'),
+    ('Суп', '#2F80ED', 'soup'),
+    ('Салат', '#6FCF97', 'salad'),
+    ('Вегетарианское', '#27AE60', 'vegetarian'),
+)
+DISHES = (
+    'суп', 'салат', 'пирог', 'омлет', 'рагу', 'плов', 'запеканка',
+    'каша', 'паста', 'котлеты', 'блины', 'сырники', 'борщ', 'лазанья',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'летний', 'острый', 'бабушкин', 'легкий',
+    'праздничный', 'сытный', 'пряный', 'нежный',
+)
+TEXT = (
+    'Подготовьте продукты. Смешайте ингредиенты, доведите до готовности '
+    'и подавайте к столу. '
+)
+
+
+def zipf_weights(size, exponent=1.1):
+    """
+    Накопленные веса распределения Ципфа: несколько элементов популярны,
+    остальные встречаются редко (популярность ингредиентов, авторов,
+    рецептов в избранном).
+    """
+    return list(itertools.accumulate(
+        1 / (rank ** exponent) for rank in range(1, size + 1)
+    ))
+
+
+def sample(rng, population, cum_weights, count):
+    """До count неповторяющихся элементов population по весам"""
+    return list(dict.fromkeys(
+        rng.choices(population, cum_weights=cum_weights, k=count)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочных тестов: '
+        'пользователи, рецепты с ингредиентами и тэгами, избранное, '
+        'корзины и подписки. Данные вставляются пакетами (bulk_create), '
+        'сигналы не вызываются; счетчики и списки покупок '
+        'пересчитываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=20000,
+            help='Количество пользователей'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=80000,
+            help='Количество рецептов'
+        )
+        parser.add_argument(
+            '--favorites', type=float, default=10,
+            help='Среднее количество рецептов в избранном пользователя'
+        )
+        parser.add_argument(
+            '--carts', type=float, default=3,
+            help='Среднее количество рецептов в корзине пользователя'
+        )
+        parser.add_argument(
+            '--follows', type=float, default=5,
+            help='Среднее количество подписок пользователя'
+        )
+        parser.add_argument(
+            '--password', default='synthetic',
+            help='Пароль всех созданных пользователей'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Зерно генератора для воспроизводимых данных'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Размер пакета вставки'
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.total = 0
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            tag_ids = self.ensure_tags()
+            ingredient_ids = self.ensure_ingredients()
+            user_ids = self.create_users(
+                options['users'], options['password']
+            )
+            recipe_ids = self.create_recipes(
+                options['recipes'], user_ids, ingredient_ids, tag_ids
+            )
+            if recipe_ids:
+                self.create_relations(
+                    user_ids, recipe_ids, options['favorites'],
+                    options['carts'], options['follows']
+                )
+
+        self.step('Списки покупок', lambda: call_command(
+            'rebuild_shopping_lists', stdout=self.stdout
+        ))
+        self.step('Счетчики', lambda: call_command(
+            'reconcile_counters', stdout=self.stdout
+        ))
+        versions.bump(
+            versions.TAGS, versions.INGREDIENTS, versions.USERS,
+            versions.RECIPES
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {self.total} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
+
+    def step(self, title, func):
+        started = time.perf_counter()
+        func()
+        self.stdout.write(
+            f'{title}: {time.perf_counter() - started:.1f} с'
+        )
+
+    def insert(self, title, model, objs):
+        """Вставляет объекты из итератора objs пакетами по batch_size"""
+        started = time.perf_counter()
+        count = 0
+        objs = iter(objs)
+        while True:
+            batch = list(itertools.islice(objs, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            count += len(batch)
+        self.total += count
+        self.stdout.write(
+            f'{title}: {count} за {time.perf_counter() - started:.1f} с'
+        )
+
+    def ensure_tags(self):
+        if not Tag.objects.exists():
+            self.insert('Тэги', Tag, (
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            ))
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def ensure_ingredients(self):
+        if not Ingredient.objects.exists():
+            self.insert('Ингредиенты', Ingredient, (
+                Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+                for i in range(1, 2001)
+            ))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        self.rng.shuffle(ingredient_ids)
+        return ingredient_ids
+
+    def create_users(self, count, password):
+        # соль как у UserCreateSerializer: хэш один на всех пользователей
+        password = make_password(password, settings.SECRET_KEY)
+        prefix = f'synthetic-{self.rng.getrandbits(32):08x}-'
+        self.insert('Пользователи', User, (
+            User(
+                username=f'{prefix}{i}',
+                email=f'{prefix}{i}@example.com',
+                first_name=f'Имя {i}',
+                last_name=f'Фамилия {i}',
+                password=password
+            )
+            for i in range(count)
+        ))
+        user_ids = list(
+            User.objects.filter(
+                username__startswith=prefix
+            ).values_list('id', flat=True)
+        )
+        self.rng.shuffle(user_ids)
+        return user_ids
+
+    def create_recipes(self, count, user_ids, ingredient_ids, tag_ids):
+        # bulk_create не возвращает id на SQLite: новые рецепты - это
+        # рецепты с id больше прежнего максимума
+        last_id = Recipe.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        authors = self.rng.choices(
+            user_ids, cum_weights=zipf_weights(len(user_ids)), k=count
+        )
+        self.insert('Рецепты', Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=(
+                    f'{self.rng.choice(ADJECTIVES).capitalize()} '
+                    f'{self.rng.choice(DISHES)} №{i}'
+                ),
+                text=TEXT * self.rng.randint(1, 5),
+                cooking_time=self.rng.randint(5, 180)
+            )
+            for i, author_id in enumerate(authors, 1)
+        ))
+        recipe_ids = list(
+            Recipe.objects.filter(id__gt=last_id).values_list('id', flat=True)
+        )
+
+        weights = zipf_weights(len(ingredient_ids))
+        self.insert('Ингредиенты рецептов', RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 500)
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in sample(
+                self.rng, ingredient_ids, weights, self.rng.randint(3, 12)
+            )
+        ))
+        self.insert('Тэги рецептов', RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, min(len(tag_ids), self.rng.randint(1, 3))
+            )
+        ))
+        return recipe_ids
+
+    def create_relations(self, user_ids, recipe_ids, favorites, carts,
+                         follows):
+        popular_recipes = recipe_ids[:]
+        self.rng.shuffle(popular_recipes)
+        recipe_weights = zipf_weights(len(popular_recipes))
+        authors = list(
+            Recipe.objects.filter(
+                id__in=recipe_ids
+            ).order_by().values_list('author_id', flat=True).distinct()
+        )
+        self.rng.shuffle(authors)
+        author_weights = zipf_weights(len(authors))
+
+        def per_user(model, title, mean, population, weights, field):
+            self.insert(title, model, (
+                model(user_id=user_id, **{field: value})
+                for user_id in user_ids
+                for value in sample(
+                    self.rng, population, weights,
+                    int(self.rng.expovariate(1 / mean)) if mean > 0 else 0
+                )
+                # подписка на себя запрещена
+                if model is not Follow or value != user_id
+            ))
+
+        per_user(
+            Favorite, 'Избранное', favorites,
+            popular_recipes, recipe_weights, 'recipe_id'
+        )
+        per_user(
+            ShoppingCart, 'Корзины', carts,
+            popular_recipes, recipe_weights, 'recipe_id'
+        )
+        per_user(
+            Follow, 'Подписки', follows, authors, author_weights, 'author_id'
+        )
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:19
+
+from django.db import migrations
+import recipes.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=recipes.fields.ContentAddressedImageField(blank=True, default=None, null=True, upload_to='recipes/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['recipe', 'tag'], name='recipetag_recipe_tag_idx'),
+        ),
+    ]
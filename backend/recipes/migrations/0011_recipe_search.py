@@ -0,0 +1,25 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:02
+
+from django.db import migrations
+
+from recipes import search
+
+
+def create_search_index(apps, schema_editor):
+    # генерируемый столбец tsvector (PostgreSQL) или таблица FTS5 (SQLite)
+    search.install(schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    search.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.3 on 2026-10-18 21:40
+
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    # btree по UPPER(name) обслуживает LIKE 'x%' только с text_pattern_ops
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_prefix_idx '
+        'ON recipes_ingredient (UPPER(name) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ingredient',
+            name='ingredient_name_upper_idx',
+        ),
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -1,17 +1,63 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import (Case, Exists, F, OuterRef, Prefetch, Sum, Value,
+                              When, Window)
+from django.db.models.functions import RowNumber, Upper
+from users.models import DenormalizedCountersMixin
+
+from . import search
+from .fields import ContentAddressedImageField
 
 User = get_user_model()
 
 
+class Fold(Upper):
+    """
+    UPPER(), одинаково переводящий в верхний регистр кириллицу на любой
+    БД: встроенный upper() SQLite меняет только латиницу, поэтому на SQLite
+    вызывается функция Python (регистрируется в signals.py).
+    """
+    SQLITE_FUNCTION = 'PY_UPPER'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function=self.SQLITE_FUNCTION,
+            **extra_context
+        )
+
+
+class IngredientQuerySet(models.QuerySet):
+    def search(self, name):
+        """
+        Ингредиенты, название которых содержит name (без учета регистра):
+        сначала совпадения по началу названия, затем по подстроке.
+        Регистр обеих сторон приводит одна и та же функция БД.
+        """
+        term = Fold(Value(name, output_field=models.CharField()))
+        return self.annotate(name_folded=Fold('name')).filter(
+            name_folded__contains=term
+        ).annotate(
+            name_rank=Case(
+                When(name_folded__startswith=term, then=Value(0)),
+                default=Value(1),
+                output_field=models.IntegerField(),
+            )
+        ).order_by('name_rank', 'name')
+
+
 class Ingredient(models.Model):
     """Модель ингредиентов"""
     name = models.CharField(max_length=200)
     measurement_unit = models.CharField(max_length=200)
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         ordering = ('name',)
+        # на PostgreSQL поиск по UPPER(name) обслуживают триграммный индекс
+        # (миграция 0005_ingredient_name_search) и индекс с
+        # text_pattern_ops для LIKE 'x%' (0012_ingredient_name_prefix)
         constraints = [
             models.UniqueConstraint(
                 fields=['name', 'measurement_unit'],
@@ -36,7 +82,96 @@ class Tag(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_amounts(self):
+        """Подгружает ингредиенты рецептов вместе с их количеством."""
+        return self.prefetch_related(
+            Prefetch(
+                'amounts',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def with_tags(self, slugs, match_all=False):
+        """
+        Рецепты с любым (match_all=True - со всеми) из тэгов slugs.
+        Подзапросы EXISTS вместо JOIN: рецепт не повторяется в выдаче
+        при нескольких совпавших тэгах, DISTINCT не нужен.
+        """
+        slugs = set(slugs)
+        if not match_all:
+            return self.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag__slug__in=slugs
+            )))
+        for slug in slugs:
+            self = self.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag__slug=slug
+            )))
+        return self
+
+    def search(self, query):
+        """
+        Полнотекстовый поиск по названию и описанию (recipes/search.py)
+        с оценкой релевантности search_rank.
+        """
+        return search.apply(self, query)
+
+    def with_user_flags(self, user):
+        """
+        Аннотирует рецепты флагами is_favorited/is_in_shopping_cart
+        для пользователя user (подзапросы EXISTS в том же SELECT).
+        """
+        if user.is_anonymous:
+            return self.annotate(
+                favorited=Value(False, output_field=models.BooleanField()),
+                in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def first_per_author(self, author_ids, limit=None):
+        """
+        Возвращает не более limit последних рецептов каждого автора
+        одним запросом (ROW_NUMBER() OVER (PARTITION BY author_id)).
+        """
+        if not author_ids:
+            # filter(author_id__in=[]) не компилируется в SQL
+            # (EmptyResultSet), а он нужен для сырого запроса ниже
+            return self.none()
+        qset = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return qset
+        ranked = qset.annotate(
+            recipe_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=[F('pub_date').desc(), F('id').desc()],
+            )
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE recipe_rank <= %s '
+            'ORDER BY author_id, recipe_rank',
+            (*params, limit)
+        )
+
+
+class ImageStatus(models.TextChoices):
+    NONE = 'none'
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+
+
+class Recipe(DenormalizedCountersMixin, models.Model):
     """Модель рецептов"""
     author = models.ForeignKey(
         User,
@@ -48,15 +183,29 @@ class Recipe(models.Model):
         max_length=200,
     )
 
-    image = models.ImageField(
+    image = ContentAddressedImageField(
         upload_to='recipes/',
         null=True,
         blank=True,
         default=None
         )
 
+    # уменьшенные копии картинки делает фоновая обработка
+    # (manage.py process_images)
+    image_status = models.CharField(
+        max_length=16,
+        choices=ImageStatus.choices,
+        default=ImageStatus.NONE,
+        editable=False,
+    )
+
     text = models.TextField()
 
+    # счетчики обновляются сигналами (recipes/counters.py)
+    COUNTER_FIELDS = ('favorites_count', 'carts_count')
+    favorites_count = models.PositiveIntegerField(default=0, editable=False)
+    carts_count = models.PositiveIntegerField(default=0, editable=False)
+
     ingredients = models.ManyToManyField(
         Ingredient,
         through='RecipeIngredient',
@@ -77,8 +226,20 @@ class Recipe(models.Model):
 
     pub_date = models.DateTimeField(auto_now_add=True)
 
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('id',),
+                condition=models.Q(image_status=ImageStatus.PENDING),
+                name='recipe_image_pending_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -117,6 +278,14 @@ class RecipeTag(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            # проверка EXISTS по паре (рецепт, тэг) - только по индексу
+            models.Index(
+                fields=('recipe', 'tag'), name='recipetag_recipe_tag_idx'
+            ),
+        ]
+
 
 class ShoppingCart(models.Model):
     user = models.ForeignKey(
@@ -164,3 +333,88 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.recipe} is {self.user} favorite'
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    def compute(self, user_ids=None, ingredient_ids=None):
+        """
+        Считает (user_id, ingredient_id, total_amount) по корзинам
+        пользователей напрямую из RecipeIngredient.
+        """
+        amounts = RecipeIngredient.objects.all()
+        if user_ids is not None:
+            amounts = amounts.filter(
+                recipe__is_in_shopping_cart__user__in=user_ids
+            )
+        else:
+            amounts = amounts.filter(
+                recipe__is_in_shopping_cart__isnull=False
+            )
+        if ingredient_ids is not None:
+            amounts = amounts.filter(ingredient__in=ingredient_ids)
+        return amounts.values_list(
+            'recipe__is_in_shopping_cart__user', 'ingredient'
+        ).annotate(total_amount=Sum('amount')).order_by()
+
+    def refresh(self, user_ids, ingredient_ids=None):
+        """
+        Пересчитывает строки списков покупок пользователей user_ids
+        (только по ингредиентам ingredient_ids, если они заданы).
+
+        Строки пользователей блокируются (SELECT ... FOR UPDATE в порядке
+        id) до конца транзакции: иначе два параллельных пересчета одного
+        пользователя удаляют строки и вставляют одни и те же, и второй
+        падает на unique_shopping_list_item. SQLite и так выполняет
+        записи последовательно.
+        """
+        stale = self.filter(user__in=user_ids)
+        if ingredient_ids is not None:
+            stale = stale.filter(ingredient__in=ingredient_ids)
+        with transaction.atomic():
+            list(
+                User.objects.select_for_update().filter(
+                    pk__in=user_ids
+                ).order_by('pk').values_list('pk', flat=True)
+            )
+            stale.delete()
+            self.bulk_create(
+                ShoppingListItem(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount
+                )
+                for user_id, ingredient_id, total_amount
+                in self.compute(user_ids, ingredient_ids)
+            )
+
+
+class ShoppingListItem(models.Model):
+    """
+    Материализованный список покупок: сумма ингредиента по всем рецептам
+    в корзине пользователя. Обновляется сигналами ShoppingCart и
+    RecipeIngredient (recipes/signals.py).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    total_amount = models.PositiveIntegerField()
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} in {self.user} shopping list'
@@ -0,0 +1,154 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+PostgreSQL: генерируемый столбец recipes_recipe.search_vector (tsvector
+по русской и английской конфигурациям, название с весом A, описание - B)
+с GIN-индексом. Столбец пересчитывается самой БД при любой записи, в том
+числе при bulk_create и update(), поэтому в модели его нет.
+
+SQLite: таблица FTS5 recipes_recipe_fts с внешним содержимым
+(content=recipes_recipe), которую поддерживают триггеры. Стемминг только
+английский (porter), русские слова ищутся по префиксу.
+
+Таблицы и триггеры создает миграция 0011_recipe_search. Перестройка
+таблицы в миграциях SQLite удаляет триггеры, поэтому после каждой
+миграции они создаются заново (post_migrate в signals.py).
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TABLE = 'recipes_recipe'
+FTS_TABLE = 'recipes_recipe_fts'
+
+PG_QUERY = (
+    "(websearch_to_tsquery('russian', %s) || "
+    "websearch_to_tsquery('english', %s))"
+)
+PG_INSTALL = (
+    f'ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector '
+    'GENERATED ALWAYS AS ('
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(text, '')), 'B')"
+    ') STORED',
+    f'CREATE INDEX IF NOT EXISTS recipe_search_idx ON {TABLE} '
+    'USING gin (search_vector)',
+)
+PG_UNINSTALL = (
+    'DROP INDEX IF EXISTS recipe_search_idx',
+    f'ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector',
+)
+
+SQLITE_TRIGGERS = (
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert '
+    f'AFTER INSERT ON {TABLE} BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete '
+    f'AFTER DELETE ON {TABLE} BEGIN '
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update '
+    f'AFTER UPDATE OF name, text ON {TABLE} BEGIN '
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+)
+SQLITE_INSTALL = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    f"name, text, content='{TABLE}', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    *SQLITE_TRIGGERS,
+)
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+# вес совпадения в названии относительно описания (bm25 в SQLite)
+SQLITE_NAME_WEIGHT = 10.0
+
+
+def install(schema_editor):
+    statements = {
+        'postgresql': PG_INSTALL, 'sqlite': SQLITE_INSTALL
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def uninstall(schema_editor):
+    statements = {
+        'postgresql': PG_UNINSTALL, 'sqlite': SQLITE_UNINSTALL
+    }.get(schema_editor.connection.vendor, ())
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def restore_sqlite_triggers(connection):
+    """Создает недостающие триггеры, если таблица FTS5 уже есть"""
+    if connection.vendor != 'sqlite':
+        return
+    if FTS_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+
+
+def sqlite_match(query):
+    """
+    Запрос FTS5 из слов query: все слова обязательны, каждое ищется
+    по префиксу. Служебный синтаксис FTS5 из ввода не попадает в запрос.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def apply(queryset, query):
+    """
+    Рецепты queryset, подходящие под поисковый запрос query, с оценкой
+    релевантности search_rank (чем больше, тем релевантнее).
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return apply_sqlite(queryset, query)
+    if vendor == 'postgresql':
+        matched = RawSQL(
+            f'{TABLE}.search_vector @@ {PG_QUERY}', (query, query),
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'ts_rank({TABLE}.search_vector, {PG_QUERY})', (query, query),
+            output_field=FloatField()
+        )
+    else:
+        matched = Q(name__icontains=query) | Q(text__icontains=query)
+        rank = Value(0.0, output_field=FloatField())
+    return queryset.filter(matched).annotate(search_rank=rank)
+
+
+def apply_sqlite(queryset, query):
+    match = sqlite_match(query)
+    if not match:
+        # в запросе нет слов; search_rank нужен для сортировки в view
+        return queryset.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    # соединение с таблицей FTS5: bm25 считается в том же проходе MATCH,
+    # а не коррелированным подзапросом на каждую строку; bm25 отрицателен
+    # и меньше у более релевантных строк
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+        select={
+            'search_rank': f'-bm25({FTS_TABLE}, {SQLITE_NAME_WEIGHT}, 1.0)'
+        }
+    )
@@ -0,0 +1,208 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_migrate, post_save, pre_save)
+from django.dispatch import receiver
+
+from . import counters, search, versions
+from .images import process_pending_images
+from .models import (Favorite, Fold, ImageStatus, Ingredient, Recipe,
+                     RecipeIngredient, RecipeTag, ShoppingCart,
+                     ShoppingListItem, Tag)
+
+User = get_user_model()
+
+amounts_signals_muted = ContextVar('amounts_signals_muted', default=False)
+
+
+@contextmanager
+def mute_amounts_signals():
+    """
+    Отключает обработчики RecipeIngredient на время пакетной записи.
+    Списки покупок и версию рецепта вызывающий код обновляет сам.
+    """
+    token = amounts_signals_muted.set(True)
+    try:
+        yield
+    finally:
+        amounts_signals_muted.reset(token)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def update_shopping_list_on_cart_change(sender, instance, **kwargs):
+    ingredient_ids = RecipeIngredient.objects.filter(
+        recipe_id=instance.recipe_id
+    ).values('ingredient_id')
+    ShoppingListItem.objects.refresh([instance.user_id], ingredient_ids)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_previous_ingredient(sender, instance, **kwargs):
+    if amounts_signals_muted.get():
+        return
+    instance._previous_ingredient_id = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('ingredient_id', flat=True).first()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def update_shopping_list_on_amount_change(sender, instance, **kwargs):
+    if amounts_signals_muted.get():
+        return
+    user_ids = ShoppingCart.objects.filter(
+        recipe_id=instance.recipe_id
+    ).values_list('user_id', flat=True)
+    if not user_ids:
+        return
+    ingredient_ids = {instance.ingredient_id}
+    previous_ingredient_id = getattr(instance, '_previous_ingredient_id', None)
+    if previous_ingredient_id is not None:
+        ingredient_ids.add(previous_ingredient_id)
+    ShoppingListItem.objects.refresh(list(user_ids), ingredient_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    versions.bump(versions.TAGS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    versions.bump(versions.INGREDIENTS)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_version(sender, instance, **kwargs):
+    versions.bump_recipes(instance.pk)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_loaded_image(sender, instance, **kwargs):
+    # при отложенной загрузке поля (only/defer) картинки в __dict__ нет
+    if 'image' in instance.__dict__:
+        image = instance.__dict__['image']
+        instance._loaded_image_name = getattr(image, 'name', image) or ''
+
+
+@receiver(pre_save, sender=Recipe)
+def update_image_status(sender, instance, raw, **kwargs):
+    if raw or not hasattr(instance, '_loaded_image_name'):
+        return
+    image = instance.image
+    if not image:
+        instance.image_status = ImageStatus.NONE
+    elif (instance._state.adding or not image._committed
+          or image.name != instance._loaded_image_name):
+        instance.image_status = ImageStatus.PENDING
+
+
+@receiver(post_save, sender=Recipe)
+def process_image_inline(sender, instance, raw, **kwargs):
+    if hasattr(instance, '_loaded_image_name'):
+        instance._loaded_image_name = instance.image.name or ''
+    if raw or not settings.IMAGE_PROCESSING_INLINE:
+        return
+    if instance.image_status == ImageStatus.PENDING:
+        transaction.on_commit(
+            lambda: process_pending_images(recipe_ids=[instance.pk])
+        )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def bump_recipe_version_on_relation_change(sender, instance, **kwargs):
+    if amounts_signals_muted.get():
+        return
+    versions.bump_recipes(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=RecipeTag)
+def bump_recipe_version_on_tags_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        versions.bump_recipes(instance.pk)
+    elif pk_set:
+        versions.bump_recipes(*pk_set)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def bump_user_favorites_version(sender, instance, **kwargs):
+    # в рецепте меняется и счетчик favorites_count; версию каталога
+    # счетчики не меняют, в кэше списка они обновляются по таймауту
+    versions.bump(
+        versions.user_favorites(instance.user_id),
+        versions.recipe(instance.recipe_id)
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_user_cart_version(sender, instance, **kwargs):
+    versions.bump(
+        versions.user_cart(instance.user_id),
+        versions.recipe(instance.recipe_id)
+    )
+
+
+RECIPE_COUNTERS = {Favorite: 'favorites_count', ShoppingCart: 'carts_count'}
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change(
+            Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    counters.change(Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    counters.change(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    # перестройка recipes_recipe в миграциях SQLite удаляет триггеры FTS5
+    if sender.name == 'recipes':
+        search.restore_sqlite_triggers(connections[using])
+
+
+def py_upper(value):
+    return None if value is None else value.upper()
+
+
+@receiver(connection_created)
+def register_sqlite_functions(sender, connection, **kwargs):
+    # upper() SQLite не меняет кириллицу, Fold использует функцию Python
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            Fold.SQLITE_FUNCTION, 1, py_upper
+        )
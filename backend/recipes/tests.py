@@ -0,0 +1,62 @@
+import os
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from . import counters
+from .models import Recipe
+
+User = get_user_model()
+
+
+class ContentAddressedImageTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_reused_file_is_touched(self):
+        field = Recipe._meta.get_field('image')
+        first = Recipe(name='first')
+        first.image.save('a.png', ContentFile(b'image'), save=False)
+        path = field.storage.path(first.image.name)
+        old = time.time() - 24 * 60 * 60
+        os.utime(path, (old, old))
+
+        second = Recipe(name='second')
+        second.image.save('b.png', ContentFile(b'image'), save=False)
+
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertGreater(os.path.getmtime(path), old + 60)
+
+
+class CountersSaveTest(TestCase):
+    def test_save_keeps_concurrent_counter_changes(self):
+        author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='recipe', text='text', cooking_time=1
+        )
+        stale_recipe = Recipe.objects.get(pk=recipe.pk)
+        stale_author = User.objects.get(pk=author.pk)
+        counters.change(Recipe, recipe.pk, 'favorites_count', 1)
+        counters.change(User, author.pk, 'followers_count', 1)
+
+        stale_recipe.name = 'renamed'
+        stale_recipe.save()
+        stale_author.first_name = 'renamed'
+        stale_author.save()
+
+        recipe.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(recipe.name, 'renamed')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(author.first_name, 'renamed')
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(author.recipes_count, 1)
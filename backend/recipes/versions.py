@@ -0,0 +1,96 @@
+"""
+Версии данных для условных GET-запросов и кэшей.
+
+Версия - случайный токен и время последнего изменения, хранящиеся в кэше
+Django. Токен меняется при каждом сохранении/удалении данных (сигналы в
+recipes/signals.py и users/signals.py). Токен, а не счетчик, выбран для
+того, чтобы после вытеснения ключа из кэша версия не могла повториться.
+Для нескольких процессов нужен общий кэш (CACHE_BACKEND). Пока версия
+свежая, ответ по ней читается из основной БД, а не с реплики
+(backend.db_routing).
+"""
+import hashlib
+import uuid
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+
+from backend.db_routing import use_primary_after_change
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+# любой рецепт каталога
+RECIPES = 'recipes'
+
+
+def recipe(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def user_favorites(user_id):
+    return f'user-favorites:{user_id}'
+
+
+def user_cart(user_id):
+    return f'user-cart:{user_id}'
+
+
+def user_follows(user_id):
+    return f'user-follows:{user_id}'
+
+
+def user_state(user_id):
+    """Версии избранного, корзины и подписок пользователя"""
+    return [user_favorites(user_id), user_cart(user_id), user_follows(user_id)]
+
+
+def _key(name):
+    return f'version:{name}'
+
+
+def _new_version():
+    return uuid.uuid4().hex, datetime.now(timezone.utc).timestamp()
+
+
+def bump(*names):
+    """
+    Меняет версии names после фиксации текущей транзакции, чтобы новая
+    версия не могла оказаться в кэше вместе со старыми данными.
+    """
+    transaction.on_commit(
+        lambda: cache.set_many(
+            {_key(name): _new_version() for name in names}, timeout=None
+        )
+    )
+
+
+def bump_recipes(*recipe_ids):
+    """Меняет версии рецептов recipe_ids и версию каталога"""
+    bump(RECIPES, *(recipe(recipe_id) for recipe_id in recipe_ids))
+
+
+def get_versions(*names):
+    """Возвращает {name: (token, timestamp)}, создавая недостающие версии"""
+    keys = {_key(name): name for name in names}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        version = _new_version()
+        cache.add(key, version, timeout=None)
+        found[key] = cache.get(key, version)
+    return {name: found[key] for key, name in keys.items()}
+
+
+def validators(*names):
+    """Возвращает (ETag, Last-Modified) для набора версий names"""
+    versions = get_versions(*names)
+    digest = hashlib.sha1()
+    for name in sorted(versions):
+        digest.update(f'{name}={versions[name][0]};'.encode())
+    timestamp = max(timestamp for _, timestamp in versions.values())
+    use_primary_after_change(timestamp)
+    return (
+        f'"{digest.hexdigest()}"',
+        datetime.fromtimestamp(timestamp, timezone.utc)
+    )
@@ -31,8 +31,9 @@ class FollowAdmin(admin.ModelAdmin):
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name',
-                    'is_admin'
+                    'is_admin', 'recipes_count', 'followers_count'
                     )
+    readonly_fields = ('recipes_count', 'followers_count')
     list_filter = ('is_admin', 'is_superuser', 'is_active')
     search_fields = ('email', 'username')
     fieldsets = (
@@ -44,5 +45,8 @@ class CustomUserAdmin(UserAdmin):
             'fields': ('is_active', 'is_admin', 'is_superuser'),
         }),
         (_('Important dates'), {'fields': ('last_login', 'date_joined')}),
+        ('Статистика', {
+            'fields': ('recipes_count', 'followers_count'),
+        }),
     )
     inlines = [FollowInline, ShoppingCartInline, FavoriteInline]
@@ -2,7 +2,26 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
-class User(AbstractUser):
+class DenormalizedCountersMixin:
+    """
+    Обычное сохранение объекта не перезаписывает счетчики COUNTER_FIELDS
+    (recipes/counters.py): их меняют только выражения F(), а значения,
+    загруженные в начале запроса, затерли бы параллельные изменения.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None):
+            skipped = {*self.COUNTER_FIELDS, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        return super().save(*args, **kwargs)
+
+
+class User(DenormalizedCountersMixin, AbstractUser):
     email = models.EmailField(unique=True)
     username = models.CharField(max_length=150, unique=True)
     first_name = models.CharField(max_length=150, default='-инкогнито-')
@@ -12,6 +31,11 @@ class User(AbstractUser):
     is_admin = models.BooleanField(default=False)
     password = models.CharField(max_length=200)
 
+    # счетчики обновляются сигналами (recipes/counters.py)
+    COUNTER_FIELDS = ('recipes_count', 'followers_count')
+    recipes_count = models.PositiveIntegerField(default=0, editable=False)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.is_admin = True
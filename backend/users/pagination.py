@@ -1,5 +1,71 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который кэширует COUNT(*) для больших выборок: если объектов
+    не меньше PAGINATION_COUNT_CACHE_THRESHOLD, число страниц считается
+    по сохраненному значению в течение PAGINATION_COUNT_CACHE_TIMEOUT.
+    """
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            # заведомо пустая выборка (none(), filter(pk__in=[]))
+            return 0
+        key = 'pagination-count:' + hashlib.sha1(
+            repr((sql, params)).encode()
+        ).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            if count >= settings.PAGINATION_COUNT_CACHE_THRESHOLD:
+                cache.set(
+                    key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+                )
+        return count
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+    django_paginator_class = CachedCountPaginator
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Курсорная пагинация по (-pub_date, -id) без COUNT(*) и OFFSET"""
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class RecipePagination(CustomPageNumberPagination):
+    """
+    Постраничная пагинация, а при наличии параметра ?cursor=
+    (пустого для первой страницы) - курсорная.
+    """
+    cursor_pagination = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if RecipeCursorPagination.cursor_query_param in request.query_params:
+            self.cursor_pagination = RecipeCursorPagination()
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,3 +1,4 @@
+from api.fields import ImageRenditionsField
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password, make_password
@@ -9,6 +10,23 @@ from .models import Follow
 User = get_user_model()
 
 
+def get_following_ids(request):
+    """
+    Возвращает id авторов, на которых подписан пользователь запроса.
+    Множество загружается одним запросом и кэшируется на объекте request,
+    поэтому его разделяют все (в том числе вложенные) сериализаторы.
+    """
+    if request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, '_following_ids'):
+        request._following_ids = frozenset(
+            Follow.objects.filter(
+                user=request.user
+            ).values_list('author_id', flat=True)
+        )
+    return request._following_ids
+
+
 class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -24,11 +42,7 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return (
-            not user.is_anonymous
-            and Follow.objects.filter(user=user, author=obj).exists()
-        )
+        return obj.id in get_following_ids(self.context.get('request'))
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -65,15 +79,19 @@ class PasswordChangeSerializer(serializers.Serializer):
 
     def update(self, instance, validated_data):
         instance.password = validated_data['new_password']
-        instance.save()
+        instance.save(update_fields=('password',))
         return instance
 
 
 class RecipeShortListSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id', 'name', 'image', 'image_status', 'image_renditions',
+            'cooking_time'
+        )
 
 
 class FollowSerializer(UserSerializer):
@@ -88,12 +106,21 @@ class FollowSerializer(UserSerializer):
             'first_name',
             'last_name',
             'is_subscribed',
-            'recipes'
+            'recipes',
+            'recipes_count',
+            'followers_count'
         )
 
     def get_recipes(self, obj):
-        qset = Recipe.objects.filter(author=obj)
-        limiter = self.context.get('recipes_limit')
-        qset = qset[:int(limiter)] if limiter else qset
-
+        """
+        Рецепты берутся из context['recipes'] ({author_id: [recipe, ...]}),
+        загруженного для всей страницы одним запросом.
+        """
+        recipes = self.context.get('recipes')
+        if recipes is None:
+            qset = Recipe.objects.first_per_author(
+                [obj.id], self.context.get('recipes_limit')
+            )
+        else:
+            qset = recipes.get(obj.id, [])
         return RecipeShortListSerializer(qset, many=True).data
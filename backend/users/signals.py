@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes import counters, versions
+
+from .models import Follow
+from .serializers import UserSerializer
+
+User = get_user_model()
+
+
+# поля пользователя в ответах с рецептами (автор рецепта)
+SERIALIZED_FIELDS = frozenset(UserSerializer.Meta.fields)
+
+
+@receiver(post_save, sender=User)
+def bump_users_version(sender, created, update_fields, raw, **kwargs):
+    # у нового пользователя нет рецептов, а вход (last_login) и смена
+    # пароля не меняют выводимых полей - кэши рецептов не сбрасываются
+    if created and not raw:
+        return
+    if update_fields is not None and not SERIALIZED_FIELDS & update_fields:
+        return
+    versions.bump(versions.USERS)
+
+
+@receiver(post_delete, sender=User)
+def bump_users_version_on_delete(sender, **kwargs):
+    versions.bump(versions.USERS)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_user_follows_version(sender, instance, **kwargs):
+    versions.bump(versions.user_follows(instance.user_id))
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        counters.change(User, instance.author_id, 'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    counters.change(User, instance.author_id, 'followers_count', -1)
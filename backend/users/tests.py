@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipes import versions
+from recipes.models import Recipe
+from rest_framework.test import APIClient
+
+from .pagination import CachedCountPaginator
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, PROFILING_THRESHOLD_MS=10 ** 9)
+class SubscriptionsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_no_subscriptions_with_recipes_limit(self):
+        response = self.client.get(
+            reverse('api:users:users-subscriptions'),
+            {'recipes_limit': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+
+class CachedCountPaginatorTest(TestCase):
+    def test_empty_queryset(self):
+        paginator = CachedCountPaginator(Recipe.objects.none(), 6)
+        self.assertEqual(paginator.count, 0)
+        self.assertEqual(list(paginator.page(1)), [])
+
+
+class UsersVersionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+
+    def users_version(self):
+        return versions.get_versions(versions.USERS)[versions.USERS]
+
+    def test_login_and_sign_up_keep_version(self):
+        version = self.users_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.user)
+            User.objects.create(username='new', email='new@example.com')
+        self.assertEqual(self.users_version(), version)
+
+    def test_profile_change_bumps_version(self):
+        version = self.users_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'renamed'
+            self.user.save()
+        self.assertNotEqual(self.users_version(), version)
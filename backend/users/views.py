@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from recipes.models import Recipe
 from rest_framework import exceptions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -29,7 +31,21 @@ class UserViewSet(viewsets.ModelViewSet):
             return UserCreateSerializer
         return UserSerializer
 
-    @action(detail=False, methods=['get', ], url_path='me')
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        try:
+            recipes_limit = int(recipes_limit)
+        except ValueError:
+            recipes_limit = -1
+        if recipes_limit < 0:
+            raise exceptions.ValidationError(
+                {'recipes_limit': 'Ожидается неотрицательное целое число'}
+            )
+        return recipes_limit
+
+    @action(detail=False, methods=['get', ], url_path='me', url_name='me')
     def get_current_user(self, request):
         if not request.user.is_authenticated:
             raise exceptions.NotAuthenticated(
@@ -57,22 +73,30 @@ class UserViewSet(viewsets.ModelViewSet):
         user = serializer.save()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, methods=['get', ], url_path='subscriptions')
+    @action(
+        detail=False, methods=['get', ], url_path='subscriptions',
+        url_name='subscriptions'
+    )
     def get_subscriptions(self, request):
         if not request.user.is_authenticated:
             raise exceptions.NotAuthenticated(
                 code=status.HTTP_401_UNAUTHORIZED
             )
 
+        recipes_limit = self.get_recipes_limit()
         queryset = User.objects.filter(following__user=request.user)
         page = self.paginate_queryset(queryset)
 
-        recipes_limit = request.query_params.get('recipes_limit')
+        recipes = {}
+        for recipe in Recipe.objects.first_per_author(
+            [author.id for author in page], recipes_limit
+        ):
+            recipes.setdefault(recipe.author_id, []).append(recipe)
         serializer = FollowSerializer(
             instance=page,
             many=True,
             context={
-                'recipes_limit': recipes_limit,
+                'recipes': recipes,
                 'request': request
             }
         )
@@ -80,6 +104,7 @@ class UserViewSet(viewsets.ModelViewSet):
         return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post', 'delete'], url_path='subscribe')
+    @transaction.atomic
     def subscribe(self, request, pk):
         author = get_object_or_404(User, pk=pk)
         subscription = Follow.objects.filter(
@@ -106,6 +131,13 @@ class UserViewSet(viewsets.ModelViewSet):
             author=author,
             user=request.user
         )
-        data = FollowSerializer(author, context={'request': request}).data
+        author.refresh_from_db(fields=('followers_count',))
+        data = FollowSerializer(
+            author,
+            context={
+                'recipes_limit': self.get_recipes_limit(),
+                'request': request
+            }
+        ).data
         data['is_subscribed'] = True
         return Response(data, status.HTTP_201_CREATED)